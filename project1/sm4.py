@@ -1,500 +1,775 @@
+import array
+import functools
+import platform
+import struct
+
+# 可选的NumPy向量化与Numba JIT加速（未安装时回退到纯Python实现）
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from sm4_ttable_numba import _crypt_blocks, _crypt_blocks_parallel, _crypt_block as _jit_crypt_block
+except ImportError:
+    _crypt_blocks = _crypt_blocks_parallel = _jit_crypt_block = None
+
+# 可选的CUDA加速（需要CuPy及NVIDIA GPU）
+try:
+    import sm4_cuda
+except ImportError:
+    sm4_cuda = None
+
+import sm4_native
+
+# 16字节分组与4个大端32位字之间的打包/解包
+_BLK = struct.Struct(">4I")
+# 8个分组（128字节）的批量打包/解包
+_BLK8 = struct.Struct(">32I")
+
+
+def _unpack_columns(data):
+    """将若干16字节分组一次解包为4列，第j列为各分组的第j个字"""
+    w = struct.unpack('>%dI' % (len(data) // 4), data)
+    return list(w[0::4]), list(w[1::4]), list(w[2::4]), list(w[3::4])
+
+
+def _pack_columns(c0, c1, c2, c3):
+    """_unpack_columns的逆操作：按分组交织各列后一次打包"""
+    out = [0] * (4 * len(c0))
+    out[0::4], out[1::4], out[2::4], out[3::4] = c0, c1, c2, c3
+    return struct.pack('>%dI' % len(out), *out)
+
+
+def rotl(value, shift):
+    """32位循环左移"""
+    return ((value << shift) | (value >> (32 - shift))) & 0xffffffff
+
+
+def l_transform(word):
+    """线性变换L（word须为32位；四个循环移位内联展开，只在最后截断一次）"""
+    return (word ^ ((word << 2) | (word >> 30)) ^ ((word << 10) | (word >> 22)) ^
+            ((word << 18) | (word >> 14)) ^ ((word << 24) | (word >> 8))) & 0xffffffff
+
+
+# S盒（bytes存储：每项1字节，索引直接得到小整数），所有实现共享
+_SM4_SBOX = bytes((
+    0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
+    0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
+    0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
+    0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
+    0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
+    0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
+    0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
+    0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
+    0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
+    0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
+    0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
+    0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
+    0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
+    0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
+    0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
+    0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48
+))
+
+# SM4固定参数（模块级常量，各实现共享）
+_SM4_FK = (0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc)
+# FK按大端拼成的128位整数，密钥扩展时与MK一次异或
+_SM4_FK_INT = int.from_bytes(_BLK.pack(*_SM4_FK), 'big')
+
+_SM4_CK = (
+    0x00070e15, 0x1c232a31, 0x383f464d, 0x545b6269,
+    0x70777e85, 0x8c939aa1, 0xa8afb6bd, 0xc4cbd2d9,
+    0xe0e7eef5, 0xfc030a11, 0x181f262d, 0x343b4249,
+    0x50575e65, 0x6c737a81, 0x888f969d, 0xa4abb2b9,
+    0xc0c7ced5, 0xdce3eaf1, 0xf8ff060d, 0x141b2229,
+    0x30373e45, 0x4c535a61, 0x686f767d, 0x848b9299,
+    0xa0a7aeb5, 0xbcc3cad1, 0xd8dfe6ed, 0xf4fb0209,
+    0x10171e25, 0x2c333a41, 0x484f565d, 0x646b7279
+)
+
+
+def _build_t_tables(sbox):
+    """预计算T表，将S盒变换和线性变换L合并（T0对应最高字节）"""
+    tables = tuple(array.array('I', [0] * 256) for _ in range(4))
+    for i in range(256):
+        t = l_transform(sbox[i])
+        tables[0][i] = rotl(t, 24)
+        tables[1][i] = rotl(t, 16)
+        tables[2][i] = rotl(t, 8)
+        tables[3][i] = t
+    return tables
+
+
+def _build_unrolled_crypt_block():
+    """
+    在导入时生成32轮完全展开的单块T表加解密函数
+
+    轮数固定，展开后省去循环迭代和每轮的元组轮换：
+    四个状态字通过变量名轮转，轮密钥以常量下标读取。
+    """
+    lines = ['def _crypt_block_unrolled(block, rk, T0, T1, T2, T3):',
+             '    x0, x1, x2, x3 = _BLK.unpack_from(block)']
+    for i in range(32):
+        a, b, c, d = ('x%d' % ((i + j) % 4) for j in range(4))
+        lines.append(f'    t = {b} ^ {c} ^ {d} ^ rk[{i}]')
+        lines.append(f'    {a} ^= T0[t >> 24] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]')
+    # 反序变换
+    lines.append('    return _BLK.pack(x3, x2, x1, x0)')
+    namespace = {'_BLK': _BLK}
+    exec(compile('\n'.join(lines), '<sm4-unrolled>', 'exec'), namespace)
+    return namespace['_crypt_block_unrolled']
+
+
+_crypt_block_unrolled = _build_unrolled_crypt_block()
+
+
 class SM4:
     """SM4对称加密算法实现"""
     
     # S盒
-    S_BOX = [
-        0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
-        0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
-        0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
-        0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
-        0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
-        0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
-        0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
-        0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
-        0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
-        0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
-        0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
-        0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
-        0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
-        0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
-        0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
-        0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48
-    ]
+    S_BOX = _SM4_SBOX
     
     # 固定参数FK
-    FK = [0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc]
+    FK = _SM4_FK
     
     # 固定参数CK
-    CK = [
-        0x00070e15, 0x1c232a31, 0x383f464d, 0x545b6269,
-        0x70777e85, 0x8c939aa1, 0xa8afb6bd, 0xc4cbd2d9,
-        0xe0e7eef5, 0xfc030a11, 0x181f262d, 0x343b4249,
-        0x50575e65, 0x6c737a81, 0x888f969d, 0xa4abb2b9,
-        0xc0c7ced5, 0xdce3eaf1, 0xf8ff060d, 0x141b2229,
-        0x30373e45, 0x4c535a61, 0x686f767d, 0x848b9299,
-        0xa0a7aeb5, 0xbcc3cad1, 0xd8dfe6ed, 0xf4fb0209,
-        0x10171e25, 0x2c333a41, 0x484f565d, 0x646b7279
-    ]
+    CK = _SM4_CK
+    
+    # S盒与L变换合成的T表，T(X) = T0[x0] ^ T1[x1] ^ T2[x2] ^ T3[x3]
+    T0, T1, T2, T3 = _build_t_tables(S_BOX)
     
     def __init__(self):
         self.round_keys = []
-    
-    def _s_box(self, byte_val):
-        """S盒变换"""
-        return self.S_BOX[byte_val]
-    
-    def _tau(self, word):
-        """非线性变换τ"""
-        a = (word >> 24) & 0xff
-        b = (word >> 16) & 0xff
-        c = (word >> 8) & 0xff
-        d = word & 0xff
-        
-        return (self._s_box(a) << 24) | (self._s_box(b) << 16) | (self._s_box(c) << 8) | self._s_box(d)
-    
-    def _rotl(self, value, shift):
-        """循环左移"""
-        return ((value << shift) | (value >> (32 - shift))) & 0xffffffff
-    
-    def _l(self, word):
-        """线性变换L"""
-        return word ^ self._rotl(word, 2) ^ self._rotl(word, 10) ^ self._rotl(word, 18) ^ self._rotl(word, 24)
-    
-    def _l_prime(self, word):
-        """线性变换L'（用于密钥扩展）"""
-        return word ^ self._rotl(word, 13) ^ self._rotl(word, 23)
-    
-    def _t(self, word):
-        """合成置换T"""
-        return self._l(self._tau(word))
-    
-    def _t_prime(self, word):
-        """合成置换T'（用于密钥扩展）"""
-        return self._l_prime(self._tau(word))
+        self._last_key = None
+        # 本地T表内核使用的C数组轮密钥（内核不可用时为None）
+        self._rk_c = self._rrk_c = None
     
     def _key_expansion(self, key):
         """密钥扩展算法"""
         if len(key) != 16:
             raise ValueError("密钥长度必须为16字节")
         
-        # 将密钥转换为4个32位字
-        mk = []
-        for i in range(4):
-            word = (key[i*4] << 24) | (key[i*4+1] << 16) | (key[i*4+2] << 8) | key[i*4+3]
-            mk.append(word)
+        # 与上次相同的密钥直接复用已扩展的轮密钥
+        if key == self._last_key:
+            return
         
-        # 生成中间密钥K
-        k = [mk[i] ^ self.FK[i] for i in range(4)]
+        key = bytes(key)
+        self.round_keys = _expand_round_keys(key)
+        self._reverse_round_keys = _expand_decrypt_round_keys(key)
+        self._last_key = key
         
-        # 生成轮密钥
-        self.round_keys = []
-        for i in range(32):
-            rk = k[0] ^ self._t_prime(k[1] ^ k[2] ^ k[3] ^ self.CK[i])
-            self.round_keys.append(rk)
-            k = k[1:] + [rk]
-    
-    def _round_function(self, x0, x1, x2, x3, rk):
-        """轮函数F"""
-        return x0 ^ self._t(x1 ^ x2 ^ x3 ^ rk)
-    
-    def _bytes_to_words(self, data):
-        """将字节数组转换为32位字数组"""
-        words = []
-        for i in range(0, len(data), 4):
-            word = (data[i] << 24) | (data[i+1] << 16) | (data[i+2] << 8) | data[i+3]
-            words.append(word)
-        return words
-    
-    def _words_to_bytes(self, words):
-        """将32位字数组转换为字节数组"""
-        data = []
-        for word in words:
-            data.extend([
-                (word >> 24) & 0xff,
-                (word >> 16) & 0xff,
-                (word >> 8) & 0xff,
-                word & 0xff
-            ])
-        return bytes(data)
+        # JIT单块内核使用的连续uint32轮密钥（解密用逆序副本）
+        if _jit_crypt_block is not None:
+            self._rk_np = np.array(self.round_keys, dtype=np.uint32)
+            self._rrk_np = self._rk_np[::-1].copy()
+        if sm4_native.ttable_available():
+            self._rk_c = sm4_native.pack_round_keys(self.round_keys)
+            self._rrk_c = sm4_native.pack_round_keys(self._reverse_round_keys)
+    
+    def _crypt_block(self, block, round_keys):
+        """32轮迭代加反序变换（round_keys为32个轮密钥的序列），使用导入时生成的完全展开版本"""
+        return _crypt_block_unrolled(block, round_keys, self.T0, self.T1, self.T2, self.T3)
     
     def encrypt_block(self, plaintext):
         """加密单个16字节数据块"""
         if len(plaintext) != 16:
             raise ValueError("数据块长度必须为16字节")
         
-        # 转换为32位字
-        x = self._bytes_to_words(plaintext)
-        
-        # 32轮加密
-        for i in range(32):
-            x[0], x[1], x[2], x[3] = x[1], x[2], x[3], self._round_function(x[0], x[1], x[2], x[3], self.round_keys[i])
-        
-        # 反序变换
-        result = [x[3], x[2], x[1], x[0]]
-        return self._words_to_bytes(result)
+        if _jit_crypt_block is not None:
+            return _BLK.pack(*_jit_crypt_block(*_BLK.unpack_from(plaintext), self._rk_np, *_SM4_T_NP))
+        if self._rk_c is not None:
+            return sm4_native.ttable_ecb_crypt(self._rk_c, plaintext)
+        return self._crypt_block(plaintext, self.round_keys)
     
     def decrypt_block(self, ciphertext):
         """解密单个16字节数据块"""
         if len(ciphertext) != 16:
             raise ValueError("数据块长度必须为16字节")
         
-        # 转换为32位字
-        x = self._bytes_to_words(ciphertext)
-        
-        # 32轮解密（使用逆序轮密钥）
-        for i in range(32):
-            x[0], x[1], x[2], x[3] = x[1], x[2], x[3], self._round_function(x[0], x[1], x[2], x[3], self.round_keys[31-i])
-        
-        # 反序变换
-        result = [x[3], x[2], x[1], x[0]]
-        return self._words_to_bytes(result)
+        # 使用逆序轮密钥
+        if _jit_crypt_block is not None:
+            return _BLK.pack(*_jit_crypt_block(*_BLK.unpack_from(ciphertext), self._rrk_np, *_SM4_T_NP))
+        if self._rrk_c is not None:
+            return sm4_native.ttable_ecb_crypt(self._rrk_c, ciphertext)
+        return self._crypt_block(ciphertext, self._reverse_round_keys)
+    
+    def schedule_key(self, key):
+        """预先扩展密钥，之后可直接调用encrypt_prepared/decrypt_prepared"""
+        self._key_expansion(key)
     
     def encrypt(self, plaintext, key):
         """加密（自动处理PKCS7填充）"""
-        self._key_expansion(key)
+        self.schedule_key(key)
+        return self.encrypt_prepared(plaintext)
+    
+    def decrypt(self, ciphertext, key):
+        """解密（自动去除PKCS7填充）"""
+        self.schedule_key(key)
+        return self.decrypt_prepared(ciphertext)
+    
+    def encrypt_prepared(self, plaintext):
+        """使用已扩展的轮密钥加密（自动处理PKCS7填充）"""
+        # JIT/向量化路径在载入数据时直接写入填充，不另外拼接填充后的副本
+        if self._rk_c is None:
+            if _crypt_blocks is not None:
+                return _jit_crypt_ecb(plaintext, self.round_keys, pad=True)
+            if np is not None and len(plaintext) >= 16 * _NP_MIN_BLOCKS:
+                return _np_crypt_ecb(plaintext, self.round_keys, pad=True)
         
         # PKCS7填充
         padding_len = 16 - (len(plaintext) % 16)
         padded_data = plaintext + bytes([padding_len] * padding_len)
         
-        result = b''
+        # 本地T表内核一次处理全部分组
+        if self._rk_c is not None:
+            return sm4_native.ttable_ecb_crypt(self._rk_c, padded_data)
+        
+        # 预分配输出缓冲区，避免逐块拼接bytes带来的重复拷贝
+        result = bytearray(len(padded_data))
         for i in range(0, len(padded_data), 16):
-            block = padded_data[i:i+16]
-            result += self.encrypt_block(block)
+            result[i:i+16] = self.encrypt_block(padded_data[i:i+16])
         
-        return result
+        return bytes(result)
     
-    def decrypt(self, ciphertext, key):
-        """解密（自动去除PKCS7填充）"""
+    def decrypt_prepared(self, ciphertext):
+        """使用已扩展的轮密钥解密（自动去除PKCS7填充）"""
         if len(ciphertext) % 16 != 0:
             raise ValueError("密文长度必须是16的倍数")
         
-        self._key_expansion(key)
-        
-        result = b''
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            result += self.decrypt_block(block)
+        if self._rrk_c is not None:
+            result = sm4_native.ttable_ecb_crypt(self._rrk_c, ciphertext)
+        elif _crypt_blocks is not None:
+            result = _jit_crypt_ecb(ciphertext, self._reverse_round_keys)
+        elif np is not None and len(ciphertext) >= 16 * _NP_MIN_BLOCKS:
+            result = _np_crypt_ecb(ciphertext, self._reverse_round_keys)
+        else:
+            result = bytearray(len(ciphertext))
+            for i in range(0, len(ciphertext), 16):
+                result[i:i+16] = self.decrypt_block(ciphertext[i:i+16])
         
-        # 去除PKCS7填充
-        padding_len = result[-1]
-        return result[:-padding_len]
+        # 校验并去除PKCS7填充
+        return bytes(_pkcs7_unpad(result))
+
+
+@functools.lru_cache(maxsize=64)
+def _expand_round_keys(key):
+    """
+    SM4密钥扩展，结果按密钥缓存并在所有实例间共享
+
+    Args:
+        key: 16字节密钥（bytes，同时作为缓存键）
+
+    Returns:
+        32个轮密钥组成的元组
+    """
+    sbox, CK = _SM4_SBOX, _SM4_CK
+    
+    # 中间密钥K预分配36个字：K0..K3 = MK ^ FK（按128位整数一次异或），其后依次为轮密钥
+    k = list(_BLK.unpack((int.from_bytes(key, 'big') ^ _SM4_FK_INT).to_bytes(16, 'big'))) + [0] * 32
+    for i in range(32):
+        t = k[i+1] ^ k[i+2] ^ k[i+3] ^ CK[i]
+        # 合成置换T' = L'(τ(t))
+        t = (sbox[t >> 24] << 24) | (sbox[(t >> 16) & 0xff] << 16) | (sbox[(t >> 8) & 0xff] << 8) | sbox[t & 0xff]
+        k[i+4] = k[i] ^ t ^ rotl(t, 13) ^ rotl(t, 23)
+    
+    return tuple(k[4:])
+
+
+@functools.lru_cache(maxsize=64)
+def _expand_decrypt_round_keys(key):
+    """解密轮密钥（加密轮密钥逆序），同样按密钥缓存，避免每次解密重新切片"""
+    return _expand_round_keys(key)[::-1]
+
+
+def _cached_round_keys(key, decrypt=False):
+    """校验密钥长度后返回共享缓存中的轮密钥元组（decrypt为真时返回逆序轮密钥）"""
+    if len(key) != 16:
+        raise ValueError("密钥长度必须为16字节")
+    if decrypt:
+        return _expand_decrypt_round_keys(bytes(key))
+    return _expand_round_keys(bytes(key))
+
+
+@functools.lru_cache(maxsize=64)
+def _native_round_keys(round_keys):
+    """按轮密钥元组缓存打包好的C数组，同一组轮密钥多次调用本地内核时只打包一次"""
+    return sm4_native.pack_round_keys(round_keys)
+
+
+def _native_ecb(crypt, data, round_keys):
+    """以缓存的打包轮密钥调用本地ECB内核（crypt为sm4_native中的*_ecb_crypt）"""
+    return crypt(_native_round_keys(tuple(round_keys)), data)
+
+
+def _pkcs7_unpad(data):
+    """
+    校验并去除PKCS7填充
+
+    填充长度须在1..16之间且全部填充字节都等于该长度。各项检查按位累积，
+    不因某个字节不符提前返回，最后只判断一次，
+    避免出错位置通过执行时间泄露（填充预言攻击）。
+
+    Args:
+        data: 解密后的数据，长度为16的倍数
+
+    Returns:
+        去除填充后的数据（data的切片）
+    """
+    if len(data) == 0:
+        raise ValueError("数据为空")
+    pad_len = data[-1]
+    # pad_len超出1..16时两个差值之一为负，其第8位为1
+    bad = ((pad_len - 1) | (16 - pad_len)) & 0x100
+    for i in range(1, 17):
+        # i <= pad_len 时掩码为0xff，只比较属于填充的字节
+        mask = ((i - pad_len - 1) >> 8) & 0xff
+        bad |= (data[-i] ^ pad_len) & mask
+    if bad:
+        raise ValueError("填充格式错误")
+    return data[:-pad_len]
+
+
+# 模块导入时一次性构建的T表，所有实例共享
+_SM4_T0, _SM4_T1, _SM4_T2, _SM4_T3 = SM4.T0, SM4.T1, SM4.T2, SM4.T3
+
+# 向量化/JIT内核使用的连续uint32表：直接映射array('I')的缓冲区，
+# 标量与向量路径共用同一份4KB表，不额外占用缓存
+if np is not None:
+    _SM4_T_NP = tuple(np.frombuffer(t, dtype=np.uint32) if t.itemsize == 4 else np.array(t, dtype=np.uint32)
+                      for t in (_SM4_T0, _SM4_T1, _SM4_T2, _SM4_T3))
+else:
+    _SM4_T_NP = None
+
+# 分组数达到该值时NumPy向量化的固定开销才低于逐块处理
+_NP_MIN_BLOCKS = 32
+
+# 分组数达到该值（64KB）时才值得承担多线程调度的开销
+_PARALLEL_MIN_BLOCKS = 4096
+
+
+def _crypt_one_block(block, round_keys):
+    """
+    单块T表加解密：Numba可用时调用JIT内核，否则使用展开的纯Python版本
+
+    Args:
+        block: 16字节数据块
+        round_keys: 32个轮密钥（逆序传入即为解密）
+
+    Returns:
+        处理后的16字节
+    """
+    if _jit_crypt_block is not None:
+        rk = np.asarray(round_keys, dtype=np.uint32)
+        return _BLK.pack(*_jit_crypt_block(*_BLK.unpack_from(block), rk, *_SM4_T_NP))
+    return _crypt_block_unrolled(block, round_keys, _SM4_T0, _SM4_T1, _SM4_T2, _SM4_T3)
+
+
+def _np_load_words(data, pad=False):
+    """
+    将数据按大端字读入uint32数组，只分配一次内存
+
+    pad为真时PKCS7填充直接写入数组尾部：完整的字从data一次转换拷入，
+    只有不足一字的余量与填充字节经过一个不超过16字节的临时对象，
+    省去先拼接出填充后bytes的那次整段拷贝。
+    """
+    n = len(data)
+    n_out = (n // 16 + 1) * 16 if pad else n
+    words = np.empty(n_out // 4, dtype=np.uint32)
+    full = n // 4
+    words[:full] = np.frombuffer(data, dtype='>u4', count=full)
+    if n_out > 4 * full:
+        pad_len = n_out - n
+        words[full:] = np.frombuffer(bytes(data[4 * full:]) + bytes([pad_len]) * pad_len, dtype='>u4')
+    return words
+
+
+def _jit_crypt_ecb(data, round_keys, pad=False):
+    """
+    使用Numba内核处理长度为16倍数的数据，大数据量时按分组多线程并行
+
+    Args:
+        data: 长度为16倍数的数据（pad为真时可为任意长度）
+        round_keys: 32个轮密钥（逆序传入即为解密）
+        pad: 是否在载入时追加PKCS7填充
+
+    Returns:
+        处理后的数据
+    """
+    state = _np_load_words(data, pad)
+    rk = np.asarray(round_keys, dtype=np.uint32)
+    if len(state) >= 4 * _PARALLEL_MIN_BLOCKS:
+        _crypt_blocks_parallel(state, rk, *_SM4_T_NP)
+    else:
+        _crypt_blocks(state, rk, *_SM4_T_NP)
+    return state.astype('>u4').tobytes()
+
+
+def _np_crypt_ecb(data, round_keys, pad=False):
+    """
+    NumPy向量化ECB：所有分组按列存放（SoA），每轮一次向量化查表同时推进
+
+    Args:
+        data: 长度为16倍数的数据（pad为真时可为任意长度）
+        round_keys: 32个轮密钥（逆序传入即为解密）
+        pad: 是否在载入时追加PKCS7填充
+
+    Returns:
+        处理后的数据
+    """
+    blocks = _np_load_words(data, pad).reshape(-1, 4)
+    T0, T1, T2, T3 = _SM4_T_NP
+    X0, X1, X2, X3 = blocks[:, 0], blocks[:, 1], blocks[:, 2], blocks[:, 3]
+
+    for rk in round_keys:
+        tmp = X1 ^ X2 ^ X3 ^ np.uint32(rk)
+        new = X0 ^ T0[tmp >> 24] ^ T1[(tmp >> 16) & 0xff] ^ T2[(tmp >> 8) & 0xff] ^ T3[tmp & 0xff]
+        X0, X1, X2, X3 = X1, X2, X3, new
+
+    return np.stack([X3, X2, X1, X0], axis=1).astype('>u4').tobytes()
+
 
 class OptimizedSM4_for_T_Table:
+    # 原始S盒
+    S_BOX = _SM4_SBOX
+    
+    # 预计算T表 - 这是关键优化；所有实例共享
+    T0, T1, T2, T3 = _SM4_T0, _SM4_T1, _SM4_T2, _SM4_T3
+    T_np = _SM4_T_NP
+    
+    # FK、CK常数
+    FK = _SM4_FK
+    CK = _SM4_CK
+    
     def __init__(self):
-        # 原始S盒
-        self.S_BOX = [
-            0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
-            0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
-            0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
-            0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
-            0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
-            0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
-            0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
-            0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
-            0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
-            0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
-            0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
-            0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
-            0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
-            0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
-            0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
-            0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48
-        ]
-        
-        # 预计算T表 - 这是关键优化
-        self._precompute_tables()
-        
-        # FK常数
-        self.FK = [0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc]
-        
-        # CK常数
-        self.CK = self._generate_ck()
-
-    def _precompute_tables(self):
-        """预计算T表，将S盒变换和线性变换L合并"""
-        self.T0 = [0] * 256
-        self.T1 = [0] * 256
-        self.T2 = [0] * 256
-        self.T3 = [0] * 256
-        
-        for i in range(256):
-            s = self.S_BOX[i]
-            # 计算L变换：L(B) = B ⊕ (B<<<2) ⊕ (B<<<10) ⊕ (B<<<18) ⊕ (B<<<24)
-            t = s ^ self._rotl32(s, 2) ^ self._rotl32(s, 10) ^ self._rotl32(s, 18) ^ self._rotl32(s, 24)
-            
-            # 预计算不同字节位置的T表
-            self.T0[i] = t & 0xffffffff
-            self.T1[i] = self._rotl32(t, 8) & 0xffffffff
-            self.T2[i] = self._rotl32(t, 16) & 0xffffffff
-            self.T3[i] = self._rotl32(t, 24) & 0xffffffff
-
-    def _generate_ck(self):
-        """生成CK常数"""
-        ck = []
-        for i in range(32):
-            k = (7 * (i // 4) + i % 4) * 4 + 7
-            ck.append(k * 0x01010101)
-        return ck
-
-    def _rotl32(self, x, n):
-        """32位循环左移"""
-        return ((x << n) | (x >> (32 - n))) & 0xffffffff
-
-    def _bytes_to_uint32(self, data):
-        """字节数组转32位整数"""
-        return (data[0] << 24) | (data[1] << 16) | (data[2] << 8) | data[3]
-
-    def _uint32_to_bytes(self, x):
-        """32位整数转字节数组"""
-        return [(x >> 24) & 0xff, (x >> 16) & 0xff, (x >> 8) & 0xff, x & 0xff]
-
-    def _optimized_t_transform(self, x):
-        """优化的T变换，使用预计算的T表"""
-        b0 = (x >> 24) & 0xff
-        b1 = (x >> 16) & 0xff
-        b2 = (x >> 8) & 0xff
-        b3 = x & 0xff
-        
-        # 使用T表进行快速查表
-        return (self.T0[b0] ^ self.T1[b1] ^ self.T2[b2] ^ self.T3[b3]) & 0xffffffff
-
-    def _key_schedule_transform(self, x):
-        """密钥扩展中的T'变换"""
-        # S盒变换
-        b0 = self.S_BOX[(x >> 24) & 0xff]
-        b1 = self.S_BOX[(x >> 16) & 0xff]
-        b2 = self.S_BOX[(x >> 8) & 0xff]
-        b3 = self.S_BOX[x & 0xff]
-        
-        s_result = (b0 << 24) | (b1 << 16) | (b2 << 8) | b3
-        
-        # L'变换：L'(B) = B ⊕ (B<<<13) ⊕ (B<<<23)
-        return (s_result ^ self._rotl32(s_result, 13) ^ self._rotl32(s_result, 23)) & 0xffffffff
+        # 最近一次使用的密钥及其正序、逆序轮密钥
+        self._last_key = None
+        self._last_rk = None
+        self._last_rrk = None
 
-    def _expand_key(self, key):
-        """密钥扩展算法"""
-        if len(key) != 16:
-            raise ValueError("密钥长度必须为16字节")
-        
-        # 将密钥分为4个32位字
-        mk = []
-        for i in range(4):
-            mk.append(self._bytes_to_uint32(key[i*4:(i+1)*4]))
-        
-        # 计算K0, K1, K2, K3
-        k = [0] * 36
-        for i in range(4):
-            k[i] = mk[i] ^ self.FK[i]
-        
-        # 生成轮密钥
-        rk = []
-        for i in range(32):
-            k[i+4] = k[i] ^ self._key_schedule_transform(k[i+1] ^ k[i+2] ^ k[i+3] ^ self.CK[i])
-            rk.append(k[i+4])
-        
-        return rk
+    def _round_keys(self, key):
+        """获取轮密钥，与上次相同的密钥直接复用缓存"""
+        if key != self._last_key:
+            self._last_rk = _cached_round_keys(key)
+            self._last_rrk = _expand_decrypt_round_keys(bytes(key))
+            self._last_key = bytes(key)
+        return self._last_rk
 
     def _encrypt_block(self, plaintext, round_keys):
         """单块加密"""
         if len(plaintext) != 16:
             raise ValueError("明文块长度必须为16字节")
         
-        # 将明文分为4个32位字
-        x = []
-        for i in range(4):
-            x.append(self._bytes_to_uint32(plaintext[i*4:(i+1)*4]))
-        
-        # 32轮迭代
-        for i in range(32):
-            # 使用优化的T变换
-            temp = x[1] ^ x[2] ^ x[3] ^ round_keys[i]
-            x[0] = x[0] ^ self._optimized_t_transform(temp)
-            # 轮换
-            x[0], x[1], x[2], x[3] = x[1], x[2], x[3], x[0]
-        
-        # 反序变换
-        x[0], x[1], x[2], x[3] = x[3], x[2], x[1], x[0]
-        
-        # 转换为字节
-        result = []
-        for i in range(4):
-            result.extend(self._uint32_to_bytes(x[i]))
-        
-        return bytes(result)
+        # 32轮迭代由JIT内核（或展开的纯Python版本）完成
+        return _crypt_one_block(plaintext, round_keys)
 
     def _decrypt_block(self, ciphertext, round_keys):
         """单块解密"""
         if len(ciphertext) != 16:
             raise ValueError("密文块长度必须为16字节")
         
-        # 解密使用逆序的轮密钥
-        reverse_keys = round_keys[::-1]
+        # 解密使用逆序的轮密钥；传入的是当前密钥的轮密钥时直接取缓存的逆序元组
+        if round_keys is self._last_rk:
+            reverse_keys = self._last_rrk
+        else:
+            reverse_keys = round_keys[::-1]
         return self._encrypt_block(ciphertext, reverse_keys)
 
+    def encrypt_ecb_bulk(self, data, key):
+        """
+        ECB批量加密：所有分组按列存放，每轮一次向量化查表同时推进
+
+        Args:
+            data: 待加密数据
+            key: 16字节密钥
+
+        Returns:
+            加密后的数据，与encrypt结果一致
+        """
+        if np is None:
+            return self.encrypt(data, key)
+
+        return _np_crypt_ecb(data, self._round_keys(key), pad=True)
+
+    def encrypt_cuda(self, data, key):
+        """
+        GPU批量ECB加密，适用于MB级以上的数据
+
+        Args:
+            data: 待加密数据
+            key: 16字节密钥
+
+        Returns:
+            加密后的数据，与encrypt结果一致
+        """
+        if sm4_cuda is None:
+            return self.encrypt(data, key)
+        return sm4_cuda.ecb_crypt(self._pkcs7_pad(data), self._round_keys(key), (self.T0, self.T1, self.T2, self.T3))
+
+    def _encrypt_blocks8(self, blocks, round_keys):
+        """
+        8分组并行加密：按列存放各分组的同一字，32轮在所有分组上同步推进
+
+        Args:
+            blocks: 128字节数据
+            round_keys: 轮密钥（逆序传入即为解密）
+
+        Returns:
+            128字节结果
+        """
+        w = _BLK8.unpack(blocks)
+        X0, X1, X2, X3 = list(w[0::4]), list(w[1::4]), list(w[2::4]), list(w[3::4])
+        T0, T1, T2, T3 = self.T0, self.T1, self.T2, self.T3
+
+        for rk in round_keys:
+            tmp = [a ^ b ^ c ^ rk for a, b, c in zip(X1, X2, X3)]
+            new = [x ^ T0[t >> 24] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+                   for x, t in zip(X0, tmp)]
+            X0, X1, X2, X3 = X1, X2, X3, new
+
+        # 反序变换后按分组交织写回
+        out = [0] * 32
+        out[0::4], out[1::4], out[2::4], out[3::4] = X3, X2, X1, X0
+        return _BLK8.pack(*out)
+
+    def _crypt_ecb(self, data, round_keys, pad=False):
+        """ECB模式处理：分组足够多时整体向量化；否则每8个分组批量处理，剩余分组逐块处理"""
+        if np is not None and len(data) >= 16 * _NP_MIN_BLOCKS:
+            return _np_crypt_ecb(data, round_keys, pad)
+        
+        if pad:
+            data = self._pkcs7_pad(data)
+        result = bytearray(len(data))
+        full = len(data) - len(data) % 128
+        for i in range(0, full, 128):
+            result[i:i+128] = self._encrypt_blocks8(data[i:i+128], round_keys)
+        for i in range(full, len(data), 16):
+            result[i:i+16] = self._encrypt_block(data[i:i+16], round_keys)
+        return bytes(result)
+
+    def _jit_crypt_blocks(self, data, round_keys, pad=False):
+        """使用Numba内核批量处理所有16字节分组（pad为真时载入同时完成填充）"""
+        return _jit_crypt_ecb(data, round_keys, pad)
+
     def _pkcs7_pad(self, data):
         """PKCS7填充"""
         pad_len = 16 - (len(data) % 16)
         return data + bytes([pad_len] * pad_len)
 
     def _pkcs7_unpad(self, data):
-        """PKCS7去填充"""
-        if len(data) == 0:
-            raise ValueError("数据为空")
-        pad_len = data[-1]
-        if pad_len > 16 or pad_len == 0:
-            raise ValueError("填充格式错误")
-        return data[:-pad_len]
+        """PKCS7去填充（常数时间校验全部填充字节）"""
+        return _pkcs7_unpad(data)
 
-    def encrypt(self, plaintext, key, mode='ECB'):
+    def schedule_key(self, key):
+        """预先扩展密钥，之后可直接调用encrypt_prepared/decrypt_prepared"""
+        self._round_keys(key)
+
+    def encrypt(self, plaintext, key):
         """加密接口"""
-        round_keys = self._expand_key(key)
-        padded_plaintext = self._pkcs7_pad(plaintext)
+        self.schedule_key(key)
+        return self.encrypt_prepared(plaintext)
+
+    def decrypt(self, ciphertext, key):
+        """解密接口"""
+        self.schedule_key(key)
+        return self.decrypt_prepared(ciphertext)
+
+    def _ecb_encrypt_blocks(self, data, pad=False):
+        """
+        使用schedule_key设置的密钥ECB加密
+
+        pad为假时data长度须为16的倍数；为真时先追加PKCS7填充，
+        Numba路径在载入数据的同时写入填充，不单独生成填充后的副本
+        """
+        key, round_keys = self._last_key, self._last_rk
+        
+        # 本地内核可用时优先使用：ARMv8 SM4指令 > GFNI > NEON查表 > 通用T表
+        if sm4_native.neon_available():
+            crypt = sm4_native.neon_ecb_encrypt
+        elif sm4_native.gfni_available():
+            crypt = sm4_native.gfni_ecb_encrypt
+        elif sm4_native.neon_tbl_available():
+            crypt = sm4_native.neon_tbl_ecb_encrypt
+        elif sm4_native.ttable_available():
+            crypt = sm4_native.ttable_ecb_encrypt
+        else:
+            crypt = None
+        if crypt is not None:
+            return crypt(key, self._pkcs7_pad(data) if pad else data)
         
-        result = b''
-        for i in range(0, len(padded_plaintext), 16):
-            block = padded_plaintext[i:i+16]
-            encrypted_block = self._encrypt_block(block, round_keys)
-            result += encrypted_block
+        if _crypt_blocks is not None:
+            return self._jit_crypt_blocks(data, round_keys, pad)
         
-        return result
+        return self._crypt_ecb(data, round_keys, pad)
 
-    def decrypt(self, ciphertext, key, mode='ECB'):
-        """解密接口"""
+    def encrypt_prepared(self, plaintext):
+        """使用schedule_key设置的密钥加密"""
+        return self._ecb_encrypt_blocks(plaintext, pad=True)
+
+    def decrypt_prepared(self, ciphertext):
+        """使用schedule_key设置的密钥解密"""
         if len(ciphertext) % 16 != 0:
             raise ValueError("密文长度必须是16的倍数")
         
-        round_keys = self._expand_key(key)
+        key = self._last_key
+        
+        if sm4_native.neon_available():
+            return self._pkcs7_unpad(sm4_native.neon_ecb_decrypt(key, ciphertext))
+        if sm4_native.gfni_available():
+            return self._pkcs7_unpad(sm4_native.gfni_ecb_decrypt(key, ciphertext))
+        if sm4_native.neon_tbl_available():
+            return self._pkcs7_unpad(sm4_native.neon_tbl_ecb_decrypt(key, ciphertext))
+        if sm4_native.ttable_available():
+            return self._pkcs7_unpad(sm4_native.ttable_ecb_decrypt(key, ciphertext))
         
-        result = b''
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            decrypted_block = self._decrypt_block(block, round_keys)
-            result += decrypted_block
+        reverse_keys = _expand_decrypt_round_keys(key)
+        if _crypt_blocks is not None:
+            return self._pkcs7_unpad(self._jit_crypt_blocks(ciphertext, reverse_keys))
         
-        return self._pkcs7_unpad(result)
+        return self._pkcs7_unpad(self._crypt_ecb(ciphertext, reverse_keys))
+
+    def _ctr_blocks(self, nonce, n):
+        """生成从nonce开始依次加1（模2^128，大端）的n个计数器分组"""
+        base = int.from_bytes(nonce, 'big')
+        if np is None:
+            return b''.join(((base + i) & ((1 << 128) - 1)).to_bytes(16, 'big') for i in range(n))
+        
+        # 拆成高低64位计算，低位溢出时向高位进位
+        hi, lo = np.uint64(base >> 64), np.uint64(base & 0xffffffffffffffff)
+        ctr = np.empty((n, 2), dtype='>u8')
+        ctr[:, 1] = lo + np.arange(n, dtype=np.uint64)
+        ctr[:, 0] = hi + (ctr[:, 1] < lo).astype(np.uint64)
+        return ctr.tobytes()
+
+    def encrypt_ctr(self, data, key, nonce):
+        """
+        CTR模式加密：一次性生成全部计数器分组并批量加密得到密钥流，再与数据异或
+
+        Args:
+            data: 任意长度的数据（无需填充）
+            key: 16字节密钥
+            nonce: 16字节初始计数器分组
+
+        Returns:
+            与data等长的密文
+        """
+        if len(nonce) != 16:
+            raise ValueError("初始计数器长度必须为16字节")
+        
+        self.schedule_key(key)
+        n = (len(data) + 15) // 16
+        keystream = self._ecb_encrypt_blocks(self._ctr_blocks(nonce, n))
+        
+        if np is None:
+            return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:len(data)], 'big')).to_bytes(len(data), 'big')
+        return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8),
+                              np.frombuffer(keystream, dtype=np.uint8, count=len(data))).tobytes()
+
+    def decrypt_ctr(self, data, key, nonce):
+        """CTR模式解密，与加密过程相同"""
+        return self.encrypt_ctr(data, key, nonce)
 
 
 # SM4 AES-NI 优化实现
-import struct
-import platform
+
+
+@functools.lru_cache(maxsize=None)
+def _cpu_flags():
+    """
+    通过py-cpuinfo读取一次CPU特性标志，结果在进程内缓存
+
+    Returns:
+        特性标志的frozenset；未安装cpuinfo时返回None
+    """
+    try:
+        import cpuinfo
+    except ImportError:
+        return None
+    return frozenset(cpuinfo.get_cpu_info().get('flags', ()))
+
 
 class SM4_AESNI_Optimized:
     """使用AES-NI指令集优化的SM4实现"""
     
+    S_BOX = _SM4_SBOX
+    FK = _SM4_FK
+    CK = _SM4_CK
+    
     def __init__(self):
-        self.S_BOX = [
-            0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
-            0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
-            0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
-            0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
-            0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
-            0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
-            0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
-            0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
-            0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
-            0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
-            0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
-            0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
-            0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
-            0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
-            0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
-            0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48
-        ]
-        
-        self.FK = [0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc]
-        self.CK = self._generate_ck()
-        
         # 检测CPU指令集支持
         self.aesni_supported = self._check_aesni_support()
         self.avx2_supported = self._check_avx2_support()
-        
-        # 预计算AES-NI优化表
-        if self.aesni_supported:
-            self._precompute_aesni_tables()
+        self.sm4_arm_supported = self._check_sm4_arm()
         
         print(f"AES-NI支持: {self.aesni_supported}")
         print(f"AVX2支持: {self.avx2_supported}")
     
     def _check_aesni_support(self):
         """检测CPU是否支持AES-NI指令"""
-        try:
-            import cpuinfo
-            info = cpuinfo.get_cpu_info()
-            return 'aes' in info.get('flags', [])
-        except ImportError:
+        if sm4_native.aesni_available():
+            return True
+        flags = _cpu_flags()
+        if flags is None:
             # 简单的平台检测
             return platform.machine() in ['x86_64', 'AMD64']
+        return 'aes' in flags
     
     def _check_avx2_support(self):
         """检测CPU是否支持AVX2指令"""
-        try:
-            import cpuinfo
-            info = cpuinfo.get_cpu_info()
-            return 'avx2' in info.get('flags', [])
-        except ImportError:
+        flags = _cpu_flags()
+        if flags is None:
             return platform.machine() in ['x86_64', 'AMD64']
+        return 'avx2' in flags
     
-    def _generate_ck(self):
-        """生成CK常数"""
-        ck = []
-        for i in range(32):
-            k = (7 * (i // 4) + i % 4) * 4 + 7
-            ck.append(k * 0x01010101)
-        return ck
-    
-    def _precompute_aesni_tables(self):
-        """预计算AES-NI优化表"""
-        # 创建针对AES-NI优化的S盒查找表
-        self.aesni_sbox = bytearray(256)
-        for i in range(256):
-            self.aesni_sbox[i] = self.S_BOX[i]
-    
-    def _rotl32(self, x, n):
-        """32位循环左移"""
-        return ((x << n) | (x >> (32 - n))) & 0xffffffff
-    
-    def _aesni_sbox_transform(self, data):
-        """使用AES-NI风格的S盒变换优化"""
-        if isinstance(data, int):
-            # 处理32位整数
-            b0 = (data >> 24) & 0xff
-            b1 = (data >> 16) & 0xff
-            b2 = (data >> 8) & 0xff
-            b3 = data & 0xff
-            
-            # 利用缓存友好的查表方式
-            return ((self.aesni_sbox[b0] << 24) |
-                    (self.aesni_sbox[b1] << 16) |
-                    (self.aesni_sbox[b2] << 8) |
-                    self.aesni_sbox[b3])
-        else:
-            # 处理字节数组
-            return bytes(self.aesni_sbox[b] for b in data)
+    def _check_sm4_arm(self):
+        """检测aarch64处理器是否支持SM4E/SM4EKEY指令（FEAT_SM4）"""
+        if sm4_native.neon_available():
+            return True
+        if platform.machine() not in ['aarch64', 'arm64']:
+            return False
+        try:
+            with open('/proc/cpuinfo') as f:
+                return any(line.startswith('Features') and 'sm4' in line.split() for line in f)
+        except OSError:
+            return False
+    
+    def _aesni_sbox_word(self, x):
+        """使用AES-NI风格的S盒变换优化（32位字，轮函数热路径无类型分支）"""
+        sb = _SM4_SBOX
+        # 利用缓存友好的查表方式
+        return (sb[(x >> 24) & 0xff] << 24) | (sb[(x >> 16) & 0xff] << 16) | (sb[(x >> 8) & 0xff] << 8) | sb[x & 0xff]
+    
+    def _aesni_sbox_bytes(self, data):
+        """对字节数组逐字节进行S盒变换"""
+        return bytes(_SM4_SBOX[b] for b in data)
     
     def _aesni_optimized_l_transform(self, word):
         """AES-NI优化的线性变换L"""
-        # 使用位操作优化，减少分支预测失败
-        # L(B) = B ⊕ (B<<<2) ⊕ (B<<<10) ⊕ (B<<<18) ⊕ (B<<<24)
-        
-        # 预计算所有旋转值
-        rot2 = self._rotl32(word, 2)
-        rot10 = self._rotl32(word, 10) 
-        rot18 = self._rotl32(word, 18)
-        rot24 = self._rotl32(word, 24)
-        
-        # 使用并行异或
-        return word ^ rot2 ^ rot10 ^ rot18 ^ rot24
+        # L(B) = B ⊕ (B<<<2) ⊕ (B<<<10) ⊕ (B<<<18) ⊕ (B<<<24)，与模块级l_transform相同
+        return l_transform(word)
     
     def _aesni_t_transform(self, x):
         """AES-NI优化的T变换"""
         # 先进行S盒变换
-        sbox_result = self._aesni_sbox_transform(x)
+        sbox_result = self._aesni_sbox_word(x)
         # 再进行线性变换
         return self._aesni_optimized_l_transform(sbox_result)
     
     def _aesni_parallel_encrypt_blocks(self, blocks, round_keys):
         """AES-NI风格的并行块加密"""
+        # 本地内核可用时一次调用处理全部分组：ARMv8 SM4指令 > AES-NI > NEON查表（无SM4指令的ARM）
+        if sm4_native.neon_available():
+            crypt = sm4_native.neon_ecb_crypt
+        elif sm4_native.aesni_available():
+            crypt = sm4_native.aesni_ecb_crypt
+        elif sm4_native.neon_tbl_available():
+            crypt = sm4_native.neon_tbl_ecb_crypt
+        else:
+            crypt = None
+        if crypt is not None:
+            out = crypt(sm4_native.pack_round_keys(round_keys), b''.join(blocks))
+            return [out[i:i+16] for i in range(0, len(out), 16)]
+        
         results = []
         
         # 如果支持AVX2，可以并行处理多个块
@@ -512,41 +787,51 @@ class SM4_AESNI_Optimized:
         
         return results
     
+    def _parallel_encrypt_blocks_bulk(self, data, round_keys):
+        """
+        对连续数据（长度为16的倍数）ECB处理，省去分组列表的拆分与拼接
+
+        Args:
+            data: 长度为16倍数的数据
+            round_keys: 32个轮密钥（逆序传入即为解密）
+
+        Returns:
+            处理后的数据
+        """
+        if sm4_native.neon_available():
+            return _native_ecb(sm4_native.neon_ecb_crypt, data, round_keys)
+        if sm4_native.aesni_available():
+            return _native_ecb(sm4_native.aesni_ecb_crypt, data, round_keys)
+        if sm4_native.neon_tbl_available():
+            return _native_ecb(sm4_native.neon_tbl_ecb_crypt, data, round_keys)
+        if np is not None:
+            return _np_crypt_ecb(data, round_keys)
+        return b''.join(self._aesni_parallel_encrypt_blocks([data[i:i+16] for i in range(0, len(data), 16)],
+                                                            round_keys))
+    
     def _parallel_encrypt_4blocks(self, blocks, round_keys):
         """并行处理4个数据块"""
-        # 将4个块转换为4个状态
-        states = []
         for block in blocks:
             if len(block) != 16:
                 raise ValueError("数据块长度必须为16字节")
-            
-            state = []
-            for i in range(4):
-                word = struct.unpack('>I', block[i*4:(i+1)*4])[0]
-                state.append(word)
-            states.append(state)
+        
+        # NumPy可用时按列（SoA）存放状态，每轮对所有分组一次向量化查表
+        if np is not None:
+            out = _np_crypt_ecb(b''.join(blocks), round_keys)
+            return [out[i:i+16] for i in range(0, len(out), 16)]
+        
+        # 各分组的同一字按列存放（最后一批可能不足4块），轮换通过列重命名完成
+        A, B, C, D = _unpack_columns(b''.join(blocks))
+        T = self._aesni_t_transform
         
         # 并行执行32轮
-        for round_idx in range(32):
-            rk = round_keys[round_idx]
-            
-            # 对4个状态并行执行轮函数
-            for i in range(4):
-                temp = states[i][1] ^ states[i][2] ^ states[i][3] ^ rk
-                states[i][0] = states[i][0] ^ self._aesni_t_transform(temp)
-                # 状态轮换
-                states[i] = [states[i][1], states[i][2], states[i][3], states[i][0]]
+        for rk in round_keys:
+            A = [a ^ T(b ^ c ^ d ^ rk) for a, b, c, d in zip(A, B, C, D)]
+            A, B, C, D = B, C, D, A
         
         # 反序变换并转换回字节
-        results = []
-        for state in states:
-            state = [state[3], state[2], state[1], state[0]]
-            block_result = b''
-            for word in state:
-                block_result += struct.pack('>I', word)
-            results.append(block_result)
-        
-        return results
+        out = _pack_columns(D, C, B, A)
+        return [out[i:i+16] for i in range(0, len(out), 16)]
     
     def _aesni_encrypt_single_block(self, block, round_keys):
         """AES-NI优化的单块加密"""
@@ -554,71 +839,35 @@ class SM4_AESNI_Optimized:
             raise ValueError("数据块长度必须为16字节")
         
         # 转换为32位字状态
-        x = []
-        for i in range(4):
-            word = struct.unpack('>I', block[i*4:(i+1)*4])[0]
-            x.append(word)
-        
-        # 32轮迭代
-        for i in range(32):
-            temp = x[1] ^ x[2] ^ x[3] ^ round_keys[i]
-            x[0] = x[0] ^ self._aesni_t_transform(temp)
-            # 轮换
-            x = [x[1], x[2], x[3], x[0]]
+        a, b, c, d = _BLK.unpack_from(block)
+        T = self._aesni_t_transform
         
-        # 反序变换
-        x = [x[3], x[2], x[1], x[0]]
-        
-        # 转换回字节
-        result = b''
-        for word in x:
-            result += struct.pack('>I', word)
-        
-        return result
-    
-    def _key_expansion_aesni(self, key):
-        """AES-NI优化的密钥扩展"""
-        if len(key) != 16:
-            raise ValueError("密钥长度必须为16字节")
+        # 32轮迭代，轮换通过变量重命名完成
+        for rk in round_keys:
+            a, b, c, d = b, c, d, a ^ T(b ^ c ^ d ^ rk)
         
-        # 将密钥转换为4个32位字
-        mk = []
-        for i in range(4):
-            word = struct.unpack('>I', key[i*4:(i+1)*4])[0]
-            mk.append(word)
-        
-        # 计算K0-K3
-        k = [mk[i] ^ self.FK[i] for i in range(4)]
-        
-        # 生成32个轮密钥，使用AES-NI优化
-        round_keys = []
-        for i in range(32):
-            temp = k[1] ^ k[2] ^ k[3] ^ self.CK[i]
-            # 使用优化的T'变换
-            t_prime = self._aesni_key_schedule_transform(temp)
-            rk = k[0] ^ t_prime
-            round_keys.append(rk)
-            # 更新k数组
-            k = [k[1], k[2], k[3], rk]
-        
-        return round_keys
-    
-    def _aesni_key_schedule_transform(self, x):
-        """AES-NI优化的密钥调度T'变换"""
-        # S盒变换
-        sbox_result = self._aesni_sbox_transform(x)
-        # L'变换: L'(B) = B ⊕ (B<<<13) ⊕ (B<<<23)
-        return sbox_result ^ self._rotl32(sbox_result, 13) ^ self._rotl32(sbox_result, 23)
+        # 反序变换并转换回字节
+        return _BLK.pack(d, c, b, a)
     
     def encrypt(self, plaintext, key):
         """AES-NI优化的加密接口"""
-        # 密钥扩展
-        round_keys = self._key_expansion_aesni(key)
-        
         # PKCS7填充
         padding_len = 16 - (len(plaintext) % 16)
         padded_data = plaintext + bytes([padding_len] * padding_len)
         
+        # 本地内核可用时直接处理全部分组（aarch64上使用SM4E指令）
+        if sm4_native.neon_available():
+            return sm4_native.neon_ecb_encrypt(key, padded_data)
+        if sm4_native.aesni_available():
+            return sm4_native.aesni_ecb_encrypt(key, padded_data)
+        
+        # 密钥扩展
+        round_keys = _cached_round_keys(key)
+        
+        # 短消息只有一个分组，直接处理，省去分块与并行调度
+        if len(padded_data) == 16:
+            return self._aesni_encrypt_single_block(padded_data, round_keys)
+        
         # 分块处理
         blocks = []
         for i in range(0, len(padded_data), 16):
@@ -634,55 +883,48 @@ class SM4_AESNI_Optimized:
         if len(ciphertext) % 16 != 0:
             raise ValueError("密文长度必须是16的倍数")
         
-        # 密钥扩展
-        round_keys = self._key_expansion_aesni(key)
-        
-        # 分块处理
-        blocks = []
-        for i in range(0, len(ciphertext), 16):
-            blocks.append(ciphertext[i:i+16])
-        
-        # 并行解密（使用逆序轮密钥）
-        reverse_keys = round_keys[::-1]
-        decrypted_blocks = self._aesni_parallel_encrypt_blocks(blocks, reverse_keys)
-        
-        result = b''.join(decrypted_blocks)
-        
-        # 去除PKCS7填充
-        padding_len = result[-1]
-        return result[:-padding_len]
+        if sm4_native.neon_available():
+            result = sm4_native.neon_ecb_decrypt(key, ciphertext)
+        elif sm4_native.aesni_available():
+            result = sm4_native.aesni_ecb_decrypt(key, ciphertext)
+        else:
+            # 密钥扩展（逆序轮密钥与正序一样按密钥缓存）
+            reverse_keys = _cached_round_keys(key, decrypt=True)
+            
+            if len(ciphertext) == 16:
+                result = self._aesni_encrypt_single_block(ciphertext, reverse_keys)
+            else:
+                # 分块处理
+                blocks = []
+                for i in range(0, len(ciphertext), 16):
+                    blocks.append(ciphertext[i:i+16])
+                
+                # 并行解密（使用逆序轮密钥）
+                decrypted_blocks = self._aesni_parallel_encrypt_blocks(blocks, reverse_keys)
+                
+                result = b''.join(decrypted_blocks)
+        
+        # 校验并去除PKCS7填充
+        return _pkcs7_unpad(result)
 
 
 # SM4 最新指令集优化实现（GFNI、VPROLD等）
 class SM4_ModernISA_Optimized:
-    """使用最新指令集优化的SM4实现（GFNI、VPROLD、AVX-512等）"""
+    """
+    使用最新指令集优化的SM4实现（ARMv8 SM4E、GFNI、VPROLD、AVX-512等）
+
+    本类只负责调度：初始化时按CPU支持情况选定一个ECB后端绑定到self._ecb，
+    指令集相关的计算全部在本地内核中完成；均不可用时回退到T表实现。
+    """
+    
+    S_BOX = _SM4_SBOX
+    FK = _SM4_FK
+    CK = _SM4_CK
+    
+    # T表（回退到T-table优化）
+    T0, T1, T2, T3 = _SM4_T0, _SM4_T1, _SM4_T2, _SM4_T3
     
     def __init__(self):
-        self.S_BOX = [
-            0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
-            0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
-            0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
-            0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
-            0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
-            0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
-            0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
-            0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
-            0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
-            0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
-            0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
-            0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
-            0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
-            0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
-            0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
-            0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48
-        ]
-        
-        self.FK = [0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc]
-        self.CK = self._generate_ck()
-        
-        # 初始化T表（回退到T-table优化）
-        self._precompute_t_tables()
-        
         # 检测最新指令集支持
         self.gfni_supported = self._check_gfni_support()
         self.vprold_supported = self._check_vprold_support() 
@@ -692,434 +934,77 @@ class SM4_ModernISA_Optimized:
         print(f"VPROLD支持: {self.vprold_supported}")
         print(f"AVX-512支持: {self.avx512_supported}")
         
-        # 预计算优化表
-        if self.gfni_supported:
-            self._precompute_gfni_tables()
-        if self.avx512_supported:
-            self._setup_avx512_constants()
-    
-    def _precompute_t_tables(self):
-        """预计算T表作为回退优化"""
-        self.T0 = [0] * 256
-        self.T1 = [0] * 256
-        self.T2 = [0] * 256
-        self.T3 = [0] * 256
-
-        for i in range(256):
-            s = self.S_BOX[i]
-            # 计算L变换：L(B) = B ⊕ (B<<<2) ⊕ (B<<<10) ⊕ (B<<<18) ⊕ (B<<<24)
-            t = s ^ self._rotl32(s, 2) ^ self._rotl32(s, 10) ^ self._rotl32(s, 18) ^ self._rotl32(s, 24)
-
-            # 预计算不同字节位置的T表
-            self.T0[i] = t & 0xffffffff
-            self.T1[i] = self._rotl32(t, 8) & 0xffffffff
-            self.T2[i] = self._rotl32(t, 16) & 0xffffffff
-            self.T3[i] = self._rotl32(t, 24) & 0xffffffff
+        # 选定ECB后端，之后的加解密不再逐次探测
+        self.backend, self._ecb = self._select_backend()
+        print(f"ECB后端: {self.backend}")
     
     def _check_gfni_support(self):
         """检测GFNI指令集支持"""
-        try:
-            import cpuinfo
-            info = cpuinfo.get_cpu_info()
-            return 'gfni' in info.get('flags', [])
-        except ImportError:
-            # 模拟支持（实际需要检测CPU）
-            return False
+        if sm4_native.gfni_available():
+            return True
+        # 未安装cpuinfo时无法检测，视为不支持
+        return 'gfni' in (_cpu_flags() or ())
     
     def _check_vprold_support(self):
-        """检测VPROLD指令集支持"""
-        try:
-            import cpuinfo
-            info = cpuinfo.get_cpu_info()
-            return 'avx512f' in info.get('flags', [])
-        except ImportError:
-            return False
+        """检测VPROLD指令集支持，128/256位寄存器上的VPROLD还需要AVX512VL"""
+        flags = _cpu_flags() or ()
+        return 'avx512f' in flags and 'avx512vl' in flags
     
     def _check_avx512_support(self):
         """检测AVX-512支持"""
-        try:
-            import cpuinfo
-            info = cpuinfo.get_cpu_info()
-            return 'avx512f' in info.get('flags', [])
-        except ImportError:
-            return False
-    
-    def _generate_ck(self):
-        """生成CK常数"""
-        ck = []
-        for i in range(32):
-            k = (7 * (i // 4) + i % 4) * 4 + 7
-            ck.append(k * 0x01010101)
-        return ck
-    
-    def _precompute_gfni_tables(self):
-        """预计算GFNI优化表"""
-        # GFNI可以用于实现更快的S盒操作
-        # 这里模拟GFNI的Galois域乘法优化
-        self.gfni_sbox_matrix = self._compute_gfni_sbox_matrix()
-    
-    def _compute_gfni_sbox_matrix(self):
-        """计算用于GFNI的S盒变换矩阵"""
-        # 这是一个简化版本，实际GFNI需要更复杂的Galois域运算
-        # 将S盒表示为8x8的二进制矩阵形式
-        matrix = [[0] * 8 for _ in range(8)]
-        
-        # 简化的S盒矩阵表示（实际需要更复杂的数学推导）
-        for i in range(8):
-            for j in range(8):
-                # 这里是简化计算，实际需要基于SM4 S盒的数学特性
-                matrix[i][j] = (i + j) % 2
-        
-        return matrix
-    
-    def _setup_avx512_constants(self):
-        """设置AVX-512常数"""
-        # 预计算用于AVX-512并行处理的常数
-        self.avx512_rotation_masks = {
-            2: 0x0102040810204080,
-            10: 0x0410412041204120,
-            18: 0x4040404040404040,
-            24: 0x8080808080808080
-        }
-    
-    def _gfni_sbox_transform(self, x):
-        """使用GFNI的S盒变换（模拟）"""
-        if not self.gfni_supported:
-            return self._fallback_sbox_transform(x)
-        
-        # 模拟GFNI指令进行S盒变换
-        # 实际实现需要内联汇编或intrinsics
-        result = 0
-        for i in range(4):
-            byte_val = (x >> (i * 8)) & 0xff
-            # 使用预计算的S盒
-            transformed = self.S_BOX[byte_val]
-            result |= (transformed << (i * 8))
-        
-        return result
-    
-    def _fallback_sbox_transform(self, x):
-        """回退的S盒变换"""
-        b0 = (x >> 24) & 0xff
-        b1 = (x >> 16) & 0xff
-        b2 = (x >> 8) & 0xff
-        b3 = x & 0xff
-        
-        return ((self.S_BOX[b0] << 24) |
-                (self.S_BOX[b1] << 16) |
-                (self.S_BOX[b2] << 8) |
-                self.S_BOX[b3])
-    
-    def _vprold_rotate(self, x, count):
-        """使用VPROLD指令的旋转（模拟）"""
-        if not self.vprold_supported:
-            return self._fallback_rotate(x, count)
-        
-        # 模拟VPROLD指令
-        # 实际需要使用AVX-512的vprol指令
-        return ((x << count) | (x >> (32 - count))) & 0xffffffff
-    
-    def _fallback_rotate(self, x, count):
-        """回退的旋转操作"""
-        return ((x << count) | (x >> (32 - count))) & 0xffffffff
-    
-    def _modern_l_transform(self, word):
-        """使用最新指令集的线性变换L"""
-        # 使用VPROLD进行高效旋转
-        rot2 = self._vprold_rotate(word, 2)
-        rot10 = self._vprold_rotate(word, 10)
-        rot18 = self._vprold_rotate(word, 18)
-        rot24 = self._vprold_rotate(word, 24)
-        
-        # 并行异或运算
-        return word ^ rot2 ^ rot10 ^ rot18 ^ rot24
-    
-    def _modern_t_transform(self, x):
-        """使用最新指令集的T变换"""
-        # GFNI优化的S盒变换
-        sbox_result = self._gfni_sbox_transform(x)
-        # VPROLD优化的线性变换
-        return self._modern_l_transform(sbox_result)
-    
-    def _avx512_parallel_encrypt(self, blocks, round_keys):
-        """AVX-512并行加密（最多16个块）"""
-        if not self.avx512_supported or len(blocks) < 8:
-            return self._fallback_parallel_encrypt(blocks, round_keys)
-        
-        # AVX-512可以并行处理16个32位字 = 4个SM4块
-        results = []
-        
-        for i in range(0, len(blocks), 4):
-            batch = blocks[i:i+4]
-            if len(batch) < 4:
-                # 处理剩余块
-                for block in batch:
-                    result = self._single_block_encrypt(block, round_keys)
-                    results.append(result)
-            else:
-                # AVX-512并行处理4个块
-                batch_results = self._avx512_encrypt_4blocks(batch, round_keys)
-                results.extend(batch_results)
-        
-        return results
+        return 'avx512f' in (_cpu_flags() or ())
     
-    def _avx512_encrypt_4blocks(self, blocks, round_keys):
-        """AVX-512并行处理4个数据块"""
-        # 转换4个块为状态矩阵
-        states = []
-        for block in blocks:
-            state = []
-            for i in range(4):
-                word = struct.unpack('>I', block[i*4:(i+1)*4])[0]
-                state.append(word)
-            states.append(state)
-        
-        # 使用AVX-512并行执行32轮
-        for round_idx in range(32):
-            rk = round_keys[round_idx]
-            
-            # 对4个状态并行执行轮函数
-            for i in range(4):
-                temp = states[i][1] ^ states[i][2] ^ states[i][3] ^ rk
-                states[i][0] = states[i][0] ^ self._modern_t_transform(temp)
-                # 状态轮换
-                states[i] = [states[i][1], states[i][2], states[i][3], states[i][0]]
-        
-        # 转换回字节格式
-        results = []
-        for state in states:
-            state = [state[3], state[2], state[1], state[0]]
-            block_result = b''
-            for word in state:
-                block_result += struct.pack('>I', word)
-            results.append(block_result)
-        
-        return results
-    
-    def _fallback_parallel_encrypt(self, blocks, round_keys):
-        """回退的并行加密"""
-        results = []
-        for block in blocks:
-            result = self._single_block_encrypt(block, round_keys)
-            results.append(result)
-        return results
-    
-    def _single_block_encrypt(self, block, round_keys):
-        """单块加密"""
-        if len(block) != 16:
-            raise ValueError("数据块长度必须为16字节")
-        
-        # 转换为32位字状态
-        x = []
-        for i in range(4):
-            word = struct.unpack('>I', block[i*4:(i+1)*4])[0]
-            x.append(word)
-        
-        # 32轮迭代
-        for i in range(32):
-            temp = x[1] ^ x[2] ^ x[3] ^ round_keys[i]
-            x[0] = x[0] ^ self._modern_t_transform(temp)
-            # 轮换
-            x = [x[1], x[2], x[3], x[0]]
-        
-        # 反序变换
-        x = [x[3], x[2], x[1], x[0]]
-        
-        # 转换回字节
-        result = b''
-        for word in x:
-            result += struct.pack('>I', word)
-        
-        return result
-    
-    def _modern_key_expansion(self, key):
-        """使用最新指令集的密钥扩展"""
-        if len(key) != 16:
-            raise ValueError("密钥长度必须为16字节")
-        
-        # 转换密钥
-        mk = []
-        for i in range(4):
-            word = struct.unpack('>I', key[i*4:(i+1)*4])[0]
-            mk.append(word)
-        
-        # 计算初始K值
-        k = [mk[i] ^ self.FK[i] for i in range(4)]
-        
-        # 生成轮密钥
-        round_keys = []
-        for i in range(32):
-            temp = k[1] ^ k[2] ^ k[3] ^ self.CK[i]
-            # 使用现代指令集优化的T'变换
-            t_prime = self._modern_key_schedule_transform(temp)
-            rk = k[0] ^ t_prime
-            round_keys.append(rk)
-            k = [k[1], k[2], k[3], rk]
-        
-        return round_keys
-    
-    def _modern_key_schedule_transform(self, x):
-        """现代指令集优化的T'变换"""
-        # S盒变换
-        sbox_result = self._gfni_sbox_transform(x)
-        # L'变换
-        rot13 = self._vprold_rotate(sbox_result, 13)
-        rot23 = self._vprold_rotate(sbox_result, 23)
-        return sbox_result ^ rot13 ^ rot23
-    
-    def encrypt(self, plaintext, key):
-        """现代指令集优化的加密接口"""
-        # 密钥扩展
-        round_keys = self._modern_key_expansion(key)
-        
-        # PKCS7填充
-        padding_len = 16 - (len(plaintext) % 16)
-        padded_data = plaintext + bytes([padding_len] * padding_len)
-        
-        # 分块
-        blocks = []
-        for i in range(0, len(padded_data), 16):
-            blocks.append(padded_data[i:i+16])
-        
-        # 使用最新指令集并行加密
-        encrypted_blocks = self._avx512_parallel_encrypt(blocks, round_keys)
-        
-        return b''.join(encrypted_blocks)
-    
-    def decrypt(self, ciphertext, key):
-        """现代指令集优化的解密接口"""
-        if len(ciphertext) % 16 != 0:
-            raise ValueError("密文长度必须是16的倍数")
-        
-        # 密钥扩展
-        round_keys = self._modern_key_expansion(key)
-        
-        # 分块
-        blocks = []
-        for i in range(0, len(ciphertext), 16):
-            blocks.append(ciphertext[i:i+16])
-        
-        # 并行解密
-        reverse_keys = round_keys[::-1]
-        decrypted_blocks = self._avx512_parallel_encrypt(blocks, reverse_keys)
-        
-        result = b''.join(decrypted_blocks)
-        
-        # 去除填充
-        padding_len = result[-1]
-        return result[:-padding_len]
-
-    def _precompute_tables(self):
-        """预计算T表，将S盒变换和线性变换L合并"""
-        self.T0 = [0] * 256
-        self.T1 = [0] * 256
-        self.T2 = [0] * 256
-        self.T3 = [0] * 256
-        
-        for i in range(256):
-            s = self.S_BOX[i]
-            # 计算L变换：L(B) = B ⊕ (B<<<2) ⊕ (B<<<10) ⊕ (B<<<18) ⊕ (B<<<24)
-            t = s ^ self._rotl32(s, 2) ^ self._rotl32(s, 10) ^ self._rotl32(s, 18) ^ self._rotl32(s, 24)
-            
-            # 预计算不同字节位置的T表
-            self.T0[i] = t & 0xffffffff
-            self.T1[i] = self._rotl32(t, 8) & 0xffffffff
-            self.T2[i] = self._rotl32(t, 16) & 0xffffffff
-            self.T3[i] = self._rotl32(t, 24) & 0xffffffff
-
-    def _generate_ck(self):
-        """生成CK常数"""
-        ck = []
-        for i in range(32):
-            k = (7 * (i // 4) + i % 4) * 4 + 7
-            ck.append(k * 0x01010101)
-        return ck
-
-    def _rotl32(self, x, n):
-        """32位循环左移"""
-        return ((x << n) | (x >> (32 - n))) & 0xffffffff
-
-    def _bytes_to_uint32(self, data):
-        """字节数组转32位整数"""
-        return (data[0] << 24) | (data[1] << 16) | (data[2] << 8) | data[3]
-
-    def _uint32_to_bytes(self, x):
-        """32位整数转字节数组"""
-        return [(x >> 24) & 0xff, (x >> 16) & 0xff, (x >> 8) & 0xff, x & 0xff]
-
-    def _optimized_t_transform(self, x):
-        """优化的T变换，使用预计算的T表"""
-        b0 = (x >> 24) & 0xff
-        b1 = (x >> 16) & 0xff
-        b2 = (x >> 8) & 0xff
-        b3 = x & 0xff
-        
-        # 使用T表进行快速查表
-        return (self.T0[b0] ^ self.T1[b1] ^ self.T2[b2] ^ self.T3[b3]) & 0xffffffff
-
-    def _key_schedule_transform(self, x):
-        """密钥扩展中的T'变换"""
-        # S盒变换
-        b0 = self.S_BOX[(x >> 24) & 0xff]
-        b1 = self.S_BOX[(x >> 16) & 0xff]
-        b2 = self.S_BOX[(x >> 8) & 0xff]
-        b3 = self.S_BOX[x & 0xff]
-        
-        s_result = (b0 << 24) | (b1 << 16) | (b2 << 8) | b3
-        
-        # L'变换：L'(B) = B ⊕ (B<<<13) ⊕ (B<<<23)
-        return (s_result ^ self._rotl32(s_result, 13) ^ self._rotl32(s_result, 23)) & 0xffffffff
+    def _select_backend(self):
+        """
+        按优先级选择ECB后端
 
-    def _expand_key(self, key):
-        """密钥扩展算法"""
-        if len(key) != 16:
-            raise ValueError("密钥长度必须为16字节")
-        
-        # 将密钥分为4个32位字
-        mk = []
-        for i in range(4):
-            mk.append(self._bytes_to_uint32(key[i*4:(i+1)*4]))
-        
-        # 计算K0, K1, K2, K3
-        k = [0] * 36
-        for i in range(4):
-            k[i] = mk[i] ^ self.FK[i]
-        
-        # 生成轮密钥
-        rk = []
-        for i in range(32):
-            k[i+4] = k[i] ^ self._key_schedule_transform(k[i+1] ^ k[i+2] ^ k[i+3] ^ self.CK[i])
-            rk.append(k[i+4])
+        ARMv8 SM4E > GFNI(+AVX-512) > AES-NI(VAES) > NEON查表 > 通用T表本地内核 > Numba > NumPy/纯Python T表
+
+        Returns:
+            (后端名称, ecb(data, round_keys)可调用对象)
+        """
+        native = (
+            # ARMv8 SM4E指令一条完成4轮
+            ('ARMv8 SM4E', sm4_native.neon_available(), sm4_native.neon_ecb_crypt),
+            # S盒由两条GFNI仿射指令完成，L的循环移位使用VPROLD
+            ('GFNI', self.gfni_supported and sm4_native.gfni_available(), sm4_native.gfni_ecb_crypt),
+            # AESENCLAST完成S盒，支持VAES+AVX-512时每次处理16个分组
+            ('AES-NI', sm4_native.aesni_available(), sm4_native.aesni_ecb_crypt),
+            # 无SM4指令的ARMv8上以TBL/TBX查表完成S盒，每次处理4个分组
+            ('NEON查表', sm4_native.neon_tbl_available(), sm4_native.neon_tbl_ecb_crypt),
+            # 32轮在C中完全展开的T表内核
+            ('T表本地内核', sm4_native.ttable_available(), sm4_native.ttable_ecb_crypt),
+        )
+        for name, available, crypt in native:
+            if available:
+                return name, functools.partial(_native_ecb, crypt)
+        
+        if _crypt_blocks is not None:
+            return 'Numba T表', _jit_crypt_ecb
+        return ('NumPy T表' if np is not None else '纯Python T表'), self._table_ecb
+    
+    def _table_ecb(self, data, round_keys):
+        """无本地内核与Numba时的ECB：分组足够多时NumPy整体向量化，否则逐块处理"""
+        if np is not None and len(data) >= 16 * _NP_MIN_BLOCKS:
+            return _np_crypt_ecb(data, round_keys)
+        
+        # 短消息只有一个分组，直接返回，省去结果缓冲区
+        if len(data) == 16:
+            return self._encrypt_block(data, round_keys)
+        
+        result = bytearray(len(data))
+        for i in range(0, len(data), 16):
+            result[i:i+16] = self._encrypt_block(data[i:i+16], round_keys)
         
-        return rk
+        return bytes(result)
 
     def _encrypt_block(self, plaintext, round_keys):
         """单块加密"""
         if len(plaintext) != 16:
             raise ValueError("明文块长度必须为16字节")
         
-        # 将明文分为4个32位字
-        x = []
-        for i in range(4):
-            x.append(self._bytes_to_uint32(plaintext[i*4:(i+1)*4]))
-        
-        # 32轮迭代
-        for i in range(32):
-            # 使用优化的T变换
-            temp = x[1] ^ x[2] ^ x[3] ^ round_keys[i]
-            x[0] = x[0] ^ self._optimized_t_transform(temp)
-            # 轮换
-            x[0], x[1], x[2], x[3] = x[1], x[2], x[3], x[0]
-        
-        # 反序变换
-        x[0], x[1], x[2], x[3] = x[3], x[2], x[1], x[0]
-        
-        # 转换为字节
-        result = []
-        for i in range(4):
-            result.extend(self._uint32_to_bytes(x[i]))
-        
-        return bytes(result)
+        # 32轮迭代由JIT内核（或展开的纯Python版本）完成
+        return _crypt_one_block(plaintext, round_keys)
 
     def _decrypt_block(self, ciphertext, round_keys):
         """单块解密"""
@@ -1136,41 +1021,35 @@ class SM4_ModernISA_Optimized:
         return data + bytes([pad_len] * pad_len)
 
     def _pkcs7_unpad(self, data):
-        """PKCS7去填充"""
-        if len(data) == 0:
-            raise ValueError("数据为空")
-        pad_len = data[-1]
-        if pad_len > 16 or pad_len == 0:
-            raise ValueError("填充格式错误")
-        return data[:-pad_len]
+        """PKCS7去填充（常数时间校验全部填充字节）"""
+        return _pkcs7_unpad(data)
+
+    def encrypt_ecb_raw(self, data, round_keys):
+        """
+        ECB处理调用方已填充好的连续数据，不做填充、不拆分为分组列表
+
+        Args:
+            data: 长度为16倍数的数据
+            round_keys: 32个轮密钥（_cached_round_keys的结果，逆序传入即为解密）
+
+        Returns:
+            处理后的数据
+        """
+        if len(data) % 16 != 0:
+            raise ValueError("数据长度必须是16的倍数")
+        return self._ecb(data, round_keys)
 
     def encrypt(self, plaintext, key, mode='ECB'):
         """加密接口"""
-        round_keys = self._expand_key(key)
-        padded_plaintext = self._pkcs7_pad(plaintext)
-        
-        result = b''
-        for i in range(0, len(padded_plaintext), 16):
-            block = padded_plaintext[i:i+16]
-            encrypted_block = self._encrypt_block(block, round_keys)
-            result += encrypted_block
-        
-        return result
+        return self._ecb(self._pkcs7_pad(plaintext), _cached_round_keys(key))
 
     def decrypt(self, ciphertext, key, mode='ECB'):
         """解密接口"""
         if len(ciphertext) % 16 != 0:
             raise ValueError("密文长度必须是16的倍数")
         
-        round_keys = self._expand_key(key)
-        
-        result = b''
-        for i in range(0, len(ciphertext), 16):
-            block = ciphertext[i:i+16]
-            decrypted_block = self._decrypt_block(block, round_keys)
-            result += decrypted_block
-        
-        return self._pkcs7_unpad(result)
+        # 逆序轮密钥按密钥缓存，解密直接走加密流程
+        return self._pkcs7_unpad(self._ecb(ciphertext, _cached_round_keys(key, decrypt=True)))
 
 
 # 性能对比测试
@@ -1240,6 +1119,19 @@ def performance_test():
     print(f"   现代指令集版本 - {test_rounds}次加解密耗时: {modern_time:.4f}秒")
     print(f"   现代指令集版本验证结果: {'成功' if decrypted_modern == plaintext else '失败'}")
     
+    # 批量接口：数据预先填充、轮密钥预先取出，只计ECB处理本身
+    padded = sm4_modern._pkcs7_pad(plaintext)
+    round_keys = _cached_round_keys(key)
+    reverse_keys = _cached_round_keys(key, decrypt=True)
+    start_time = time.time()
+    for _ in range(test_rounds):
+        ciphertext_raw = sm4_modern.encrypt_ecb_raw(padded, round_keys)
+        decrypted_raw = sm4_modern.encrypt_ecb_raw(ciphertext_raw, reverse_keys)
+    raw_time = time.time() - start_time
+    
+    print(f"   现代指令集批量接口 - {test_rounds}次加解密耗时: {raw_time:.4f}秒")
+    print(f"   批量接口验证结果: {'成功' if decrypted_raw == padded else '失败'}")
+    
     # 性能对比分析
     print("\n" + "=" * 60)
     print("性能对比分析:")
@@ -1250,7 +1142,8 @@ def performance_test():
         ("原始版本", original_time),
         ("T-Table优化", opt_time),
         ("AES-NI优化", aesni_time),
-        ("现代指令集优化", modern_time)
+        ("现代指令集优化", modern_time),
+        ("现代指令集批量接口", raw_time)
     ]
     
     for name, time_cost in versions:
@@ -1401,7 +1294,7 @@ def optimization_summary():
     print("\n优化效果预期:")
     print("- T-Table优化: 2-3倍性能提升")
     print("- AES-NI优化: 3-5倍性能提升") 
-    print("- 现代指令集: 5-8倍性能提升")
+    print("- 现代指令集: 取决于初始化时选定的ECB后端（SM4E/GFNI/AES-NI本地内核最快）")
     
     print("\n技术特点:")
     print("- 向后兼容: 自动回退到软件实现")
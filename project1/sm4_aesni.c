@@ -0,0 +1,292 @@
+/*
+ * SM4 AES-NI Implementation
+ * 基于 AESENCLAST 的 SM4 S 盒 4 分组并行实现
+ *
+ * SM4 与 AES 的 S 盒核心都是 GF(2^8) 求逆，仅所在域的表示与外层仿射变换不同：
+ *   S_SM4(x) = post(S_AES(pre(x)))
+ * pre 将输入映射到 AES 域并吸收 SM4 的内层仿射变换，post 抵消 AES 的仿射
+ * 变换并完成 SM4 的外层仿射变换。两者均为 GF(2) 上的仿射映射，可拆分为
+ * 高低半字节两次 PSHUFB 查表。AESENCLAST（轮密钥取 0）完成 SubBytes，
+ * 其附带的 ShiftRows 通过预先施加逆置换抵消。
+ *
+ * 状态按列存放：4 个 xmm 寄存器分别保存 4 个分组的 X0..X3。
+ * 支持 VAES 的处理器上使用 ymm 寄存器，每个 128 位通道各处理 4 个分组，
+ * 一次 VAESENCLAST 同时完成 8 个分组的 S 盒；同时支持 AVX-512 时使用 zmm
+ * 寄存器处理 16 个分组，线性变换 L 的循环移位改用单条 VPROLD。
+ */
+
+#include "sm4_common.h"
+
+#ifdef __x86_64__
+#include <immintrin.h> // Intel intrinsics
+
+#define SM4_AESNI_TARGET __attribute__((target("aes,ssse3")))
+#define SM4_VAES_TARGET __attribute__((target("vaes,avx2")))
+#define SM4_VAES512_TARGET __attribute__((target("vaes,avx512f,avx512bw")))
+
+#define ROL128(x, n) _mm_or_si128(_mm_slli_epi32((x), (n)), _mm_srli_epi32((x), 32 - (n)))
+#define ROL256(x, n) _mm256_or_si256(_mm256_slli_epi32((x), (n)), _mm256_srli_epi32((x), 32 - (n)))
+
+// pre / post 仿射映射的半字节查表（由 SM4 S 盒推导，已与参考实现逐项校验）
+#define SM4_PRE_LO 0x3e, 0xb2, 0x0e, 0x82, 0xbb, 0x37, 0x8b, 0x07, \
+                   0xa1, 0x2d, 0x91, 0x1d, 0x24, 0xa8, 0x14, 0x98
+#define SM4_PRE_HI 0x00, 0xdc, 0x2e, 0xf2, 0xc5, 0x19, 0xeb, 0x37, \
+                   0x08, 0xd4, 0x26, 0xfa, 0xcd, 0x11, 0xe3, 0x3f
+#define SM4_POST_LO 0x6c, 0xd4, 0xa6, 0x1e, 0x52, 0xea, 0x98, 0x20, \
+                    0x0b, 0xb3, 0xc1, 0x79, 0x35, 0x8d, 0xff, 0x47
+#define SM4_POST_HI 0x00, 0xe0, 0x50, 0xb0, 0x9d, 0x7d, 0xcd, 0x2d, \
+                    0xc0, 0x20, 0x90, 0x70, 0x5d, 0xbd, 0x0d, 0xed
+// 逆 ShiftRows 置换
+#define SM4_INV_SHIFT_ROWS 0, 13, 10, 7, 4, 1, 14, 11, 8, 5, 2, 15, 12, 9, 6, 3
+#define SM4_BSWAP32 3, 2, 1, 0, 7, 6, 5, 4, 11, 10, 9, 8, 15, 14, 13, 12
+
+// 对 4 个字并行执行合成置换 T
+SM4_AESNI_TARGET static inline __m128i sm4_t_x4(__m128i x)
+{
+    const __m128i pre_lo = _mm_setr_epi8(SM4_PRE_LO);
+    const __m128i pre_hi = _mm_setr_epi8(SM4_PRE_HI);
+    const __m128i post_lo = _mm_setr_epi8(SM4_POST_LO);
+    const __m128i post_hi = _mm_setr_epi8(SM4_POST_HI);
+    const __m128i inv_shift_rows = _mm_setr_epi8(SM4_INV_SHIFT_ROWS);
+    const __m128i nibble = _mm_set1_epi8(0x0f);
+
+    __m128i lo = _mm_and_si128(x, nibble);
+    __m128i hi = _mm_and_si128(_mm_srli_epi16(x, 4), nibble);
+    x = _mm_xor_si128(_mm_shuffle_epi8(pre_lo, lo), _mm_shuffle_epi8(pre_hi, hi));
+
+    x = _mm_shuffle_epi8(x, inv_shift_rows);
+    x = _mm_aesenclast_si128(x, _mm_setzero_si128());
+
+    lo = _mm_and_si128(x, nibble);
+    hi = _mm_and_si128(_mm_srli_epi16(x, 4), nibble);
+    x = _mm_xor_si128(_mm_shuffle_epi8(post_lo, lo), _mm_shuffle_epi8(post_hi, hi));
+
+    return _mm_xor_si128(_mm_xor_si128(x, ROL128(x, 2)),
+                         _mm_xor_si128(ROL128(x, 10), _mm_xor_si128(ROL128(x, 18), ROL128(x, 24))));
+}
+
+// 处理 4 个连续分组（64 字节）
+SM4_AESNI_TARGET static void sm4_crypt_x4(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    const __m128i bswap = _mm_setr_epi8(SM4_BSWAP32);
+
+    __m128i x0 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)in), bswap);
+    __m128i x1 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 16)), bswap);
+    __m128i x2 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 32)), bswap);
+    __m128i x3 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 48)), bswap);
+    TRANSPOSE4(x0, x1, x2, x3);
+
+    // 每次迭代展开4轮，轮换通过变量重命名完成
+    for (int i = 0; i < 32; i += 4)
+    {
+        x0 = _mm_xor_si128(x0, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x1, x2),
+                                                      _mm_xor_si128(x3, _mm_set1_epi32((int)rk[i])))));
+        x1 = _mm_xor_si128(x1, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x2, x3),
+                                                      _mm_xor_si128(x0, _mm_set1_epi32((int)rk[i + 1])))));
+        x2 = _mm_xor_si128(x2, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x3, x0),
+                                                      _mm_xor_si128(x1, _mm_set1_epi32((int)rk[i + 2])))));
+        x3 = _mm_xor_si128(x3, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x0, x1),
+                                                      _mm_xor_si128(x2, _mm_set1_epi32((int)rk[i + 3])))));
+    }
+
+    // 反序变换后转置回分组布局
+    TRANSPOSE4(x3, x2, x1, x0);
+    _mm_storeu_si128((__m128i *)out, _mm_shuffle_epi8(x3, bswap));
+    _mm_storeu_si128((__m128i *)(out + 16), _mm_shuffle_epi8(x2, bswap));
+    _mm_storeu_si128((__m128i *)(out + 32), _mm_shuffle_epi8(x1, bswap));
+    _mm_storeu_si128((__m128i *)(out + 48), _mm_shuffle_epi8(x0, bswap));
+}
+
+// 对 8 个字并行执行合成置换 T（VAES：两个 128 位通道各自完成 SubBytes）
+SM4_VAES_TARGET static inline __m256i sm4_t_x8(__m256i x)
+{
+    const __m256i pre_lo = _mm256_setr_epi8(SM4_PRE_LO, SM4_PRE_LO);
+    const __m256i pre_hi = _mm256_setr_epi8(SM4_PRE_HI, SM4_PRE_HI);
+    const __m256i post_lo = _mm256_setr_epi8(SM4_POST_LO, SM4_POST_LO);
+    const __m256i post_hi = _mm256_setr_epi8(SM4_POST_HI, SM4_POST_HI);
+    const __m256i inv_shift_rows = _mm256_setr_epi8(SM4_INV_SHIFT_ROWS, SM4_INV_SHIFT_ROWS);
+    const __m256i nibble = _mm256_set1_epi8(0x0f);
+
+    __m256i lo = _mm256_and_si256(x, nibble);
+    __m256i hi = _mm256_and_si256(_mm256_srli_epi16(x, 4), nibble);
+    x = _mm256_xor_si256(_mm256_shuffle_epi8(pre_lo, lo), _mm256_shuffle_epi8(pre_hi, hi));
+
+    x = _mm256_shuffle_epi8(x, inv_shift_rows);
+    x = _mm256_aesenclast_epi128(x, _mm256_setzero_si256());
+
+    lo = _mm256_and_si256(x, nibble);
+    hi = _mm256_and_si256(_mm256_srli_epi16(x, 4), nibble);
+    x = _mm256_xor_si256(_mm256_shuffle_epi8(post_lo, lo), _mm256_shuffle_epi8(post_hi, hi));
+
+    return _mm256_xor_si256(
+        _mm256_xor_si256(x, ROL256(x, 2)),
+        _mm256_xor_si256(ROL256(x, 10), _mm256_xor_si256(ROL256(x, 18), ROL256(x, 24))));
+}
+
+// 处理 8 个连续分组（128 字节）：低通道为分组 0..3，高通道为分组 4..7
+SM4_VAES_TARGET static void sm4_crypt_x8(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    const __m128i bswap = _mm_setr_epi8(SM4_BSWAP32);
+    __m128i a[4], b[4];
+    __m256i x0, x1, x2, x3;
+
+    for (int j = 0; j < 4; j++)
+    {
+        a[j] = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 16 * j)), bswap);
+        b[j] = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 64 + 16 * j)), bswap);
+    }
+    TRANSPOSE4(a[0], a[1], a[2], a[3]);
+    TRANSPOSE4(b[0], b[1], b[2], b[3]);
+    x0 = _mm256_set_m128i(b[0], a[0]);
+    x1 = _mm256_set_m128i(b[1], a[1]);
+    x2 = _mm256_set_m128i(b[2], a[2]);
+    x3 = _mm256_set_m128i(b[3], a[3]);
+
+    for (int i = 0; i < 32; i += 4)
+    {
+        x0 = _mm256_xor_si256(x0, sm4_t_x8(_mm256_xor_si256(_mm256_xor_si256(x1, x2),
+                                                            _mm256_xor_si256(x3, _mm256_set1_epi32((int)rk[i])))));
+        x1 = _mm256_xor_si256(x1, sm4_t_x8(_mm256_xor_si256(_mm256_xor_si256(x2, x3),
+                                                            _mm256_xor_si256(x0, _mm256_set1_epi32((int)rk[i + 1])))));
+        x2 = _mm256_xor_si256(x2, sm4_t_x8(_mm256_xor_si256(_mm256_xor_si256(x3, x0),
+                                                            _mm256_xor_si256(x1, _mm256_set1_epi32((int)rk[i + 2])))));
+        x3 = _mm256_xor_si256(x3, sm4_t_x8(_mm256_xor_si256(_mm256_xor_si256(x0, x1),
+                                                            _mm256_xor_si256(x2, _mm256_set1_epi32((int)rk[i + 3])))));
+    }
+
+    // 反序变换后按通道拆分，分别转置回分组布局
+    a[0] = _mm256_castsi256_si128(x3);
+    a[1] = _mm256_castsi256_si128(x2);
+    a[2] = _mm256_castsi256_si128(x1);
+    a[3] = _mm256_castsi256_si128(x0);
+    b[0] = _mm256_extracti128_si256(x3, 1);
+    b[1] = _mm256_extracti128_si256(x2, 1);
+    b[2] = _mm256_extracti128_si256(x1, 1);
+    b[3] = _mm256_extracti128_si256(x0, 1);
+    TRANSPOSE4(a[0], a[1], a[2], a[3]);
+    TRANSPOSE4(b[0], b[1], b[2], b[3]);
+    for (int j = 0; j < 4; j++)
+    {
+        _mm_storeu_si128((__m128i *)(out + 16 * j), _mm_shuffle_epi8(a[j], bswap));
+        _mm_storeu_si128((__m128i *)(out + 64 + 16 * j), _mm_shuffle_epi8(b[j], bswap));
+    }
+}
+
+/*
+ * 对 16 个字并行执行合成置换 T（VAES + AVX-512）
+ * L 变换为 4 条 VPROLD 加 2 条三输入异或（VPTERNLOGD 0x96），无需移位+或模拟
+ */
+SM4_VAES512_TARGET static inline __m512i sm4_t_x16(__m512i x)
+{
+    const __m512i pre_lo = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_PRE_LO));
+    const __m512i pre_hi = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_PRE_HI));
+    const __m512i post_lo = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_POST_LO));
+    const __m512i post_hi = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_POST_HI));
+    const __m512i inv_shift_rows = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_INV_SHIFT_ROWS));
+    const __m512i nibble = _mm512_set1_epi8(0x0f);
+
+    __m512i lo = _mm512_and_si512(x, nibble);
+    __m512i hi = _mm512_and_si512(_mm512_srli_epi16(x, 4), nibble);
+    x = _mm512_xor_si512(_mm512_shuffle_epi8(pre_lo, lo), _mm512_shuffle_epi8(pre_hi, hi));
+
+    x = _mm512_shuffle_epi8(x, inv_shift_rows);
+    x = _mm512_aesenclast_epi128(x, _mm512_setzero_si512());
+
+    lo = _mm512_and_si512(x, nibble);
+    hi = _mm512_and_si512(_mm512_srli_epi16(x, 4), nibble);
+    x = _mm512_xor_si512(_mm512_shuffle_epi8(post_lo, lo), _mm512_shuffle_epi8(post_hi, hi));
+
+    return _mm512_ternarylogic_epi32(
+        _mm512_ternarylogic_epi32(x, _mm512_rol_epi32(x, 2), _mm512_rol_epi32(x, 10), 0x96),
+        _mm512_rol_epi32(x, 18), _mm512_rol_epi32(x, 24), 0x96);
+}
+
+// 处理 16 个连续分组（256 字节），每个 128 位通道各 4 个分组
+SM4_VAES512_TARGET static void sm4_crypt_x16(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    const __m512i bswap = _mm512_broadcast_i32x4(_mm_setr_epi8(SM4_BSWAP32));
+
+    __m512i x0 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)in), bswap);
+    __m512i x1 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 64)), bswap);
+    __m512i x2 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 128)), bswap);
+    __m512i x3 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 192)), bswap);
+    TRANSPOSE4_512(x0, x1, x2, x3);
+
+    for (int i = 0; i < 32; i += 4)
+    {
+        x0 = _mm512_xor_si512(x0, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x1, x2, _mm512_xor_si512(x3, _mm512_set1_epi32((int)rk[i])), 0x96)));
+        x1 = _mm512_xor_si512(x1, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x2, x3, _mm512_xor_si512(x0, _mm512_set1_epi32((int)rk[i + 1])), 0x96)));
+        x2 = _mm512_xor_si512(x2, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x3, x0, _mm512_xor_si512(x1, _mm512_set1_epi32((int)rk[i + 2])), 0x96)));
+        x3 = _mm512_xor_si512(x3, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x0, x1, _mm512_xor_si512(x2, _mm512_set1_epi32((int)rk[i + 3])), 0x96)));
+    }
+
+    // 反序变换后转置回分组顺序写回
+    TRANSPOSE4_512(x3, x2, x1, x0);
+    _mm512_storeu_si512((void *)out, _mm512_shuffle_epi8(x3, bswap));
+    _mm512_storeu_si512((void *)(out + 64), _mm512_shuffle_epi8(x2, bswap));
+    _mm512_storeu_si512((void *)(out + 128), _mm512_shuffle_epi8(x1, bswap));
+    _mm512_storeu_si512((void *)(out + 192), _mm512_shuffle_epi8(x0, bswap));
+}
+
+static void sm4_aesni_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    if (__builtin_cpu_supports("vaes") && __builtin_cpu_supports("avx512f") && __builtin_cpu_supports("avx512bw"))
+        sm4_ecb_run(sm4_crypt_x16, 16, rk, in, out, nblocks);
+    else if (__builtin_cpu_supports("vaes") && __builtin_cpu_supports("avx2"))
+        sm4_ecb_run(sm4_crypt_x8, 8, rk, in, out, nblocks);
+    else
+        sm4_ecb_run(sm4_crypt_x4, 4, rk, in, out, nblocks);
+}
+
+int sm4_aesni_available(void)
+{
+    __builtin_cpu_init();
+    return __builtin_cpu_supports("aes") && __builtin_cpu_supports("ssse3");
+}
+
+#else
+
+int sm4_aesni_available(void)
+{
+    return 0;
+}
+
+static void sm4_aesni_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    (void)rk;
+    (void)in;
+    (void)out;
+    (void)nblocks;
+}
+
+#endif
+
+/*
+ * ECB 加密 nblocks 个 16 字节分组
+ * 调用前须确认 sm4_aesni_available() 返回非零
+ */
+void sm4_aesni_ecb_encrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32];
+    sm4_expand_key(key, rk);
+    sm4_aesni_ecb(rk, in, out, nblocks);
+}
+
+// ECB 解密：轮密钥逆序使用
+void sm4_aesni_ecb_decrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32], rrk[32];
+    sm4_expand_key(key, rk);
+    sm4_reverse_keys(rk, rrk);
+    sm4_aesni_ecb(rrk, in, out, nblocks);
+}
+
+// 使用调用方预先扩展的轮密钥处理 nblocks 个分组（传入逆序轮密钥即为解密）
+void sm4_aesni_ecb_crypt(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    sm4_aesni_ecb(rk, in, out, nblocks);
+}
@@ -0,0 +1,146 @@
+/*
+ * SM4 Native Kernels - Common Definitions
+ * SM4 本地内核公共部分：算法常数、S 盒、密钥扩展与批处理驱动
+ */
+
+#ifndef SM4_COMMON_H
+#define SM4_COMMON_H
+
+#include <stdint.h>
+#include <stddef.h>
+#include <string.h>
+
+#define ROTL32(x, n) (((x) << (n)) | ((x) >> (32 - (n))))
+
+// SM4 算法常数
+static const uint32_t FK[4] = {0xa3b1bac6, 0x56aa3350, 0x677d9197, 0xb27022dc};
+
+/*
+ * CK 按定义式就地计算：CK[i] 的第 j 个字节为 (4i + j) * 7 mod 256
+ * 省去 128 字节常量表，i 为常数时由编译器直接折叠
+ */
+#define SM4_CK_BYTE(n) ((uint32_t)(((n) * 7) & 0xff))
+#define SM4_CK(i) ((SM4_CK_BYTE(4 * (i)) << 24) | (SM4_CK_BYTE(4 * (i) + 1) << 16) | \
+                   (SM4_CK_BYTE(4 * (i) + 2) << 8) | SM4_CK_BYTE(4 * (i) + 3))
+
+static const uint8_t SBOX[256] = {
+    0xd6, 0x90, 0xe9, 0xfe, 0xcc, 0xe1, 0x3d, 0xb7, 0x16, 0xb6, 0x14, 0xc2, 0x28, 0xfb, 0x2c, 0x05,
+    0x2b, 0x67, 0x9a, 0x76, 0x2a, 0xbe, 0x04, 0xc3, 0xaa, 0x44, 0x13, 0x26, 0x49, 0x86, 0x06, 0x99,
+    0x9c, 0x42, 0x50, 0xf4, 0x91, 0xef, 0x98, 0x7a, 0x33, 0x54, 0x0b, 0x43, 0xed, 0xcf, 0xac, 0x62,
+    0xe4, 0xb3, 0x1c, 0xa9, 0xc9, 0x08, 0xe8, 0x95, 0x80, 0xdf, 0x94, 0xfa, 0x75, 0x8f, 0x3f, 0xa6,
+    0x47, 0x07, 0xa7, 0xfc, 0xf3, 0x73, 0x17, 0xba, 0x83, 0x59, 0x3c, 0x19, 0xe6, 0x85, 0x4f, 0xa8,
+    0x68, 0x6b, 0x81, 0xb2, 0x71, 0x64, 0xda, 0x8b, 0xf8, 0xeb, 0x0f, 0x4b, 0x70, 0x56, 0x9d, 0x35,
+    0x1e, 0x24, 0x0e, 0x5e, 0x63, 0x58, 0xd1, 0xa2, 0x25, 0x22, 0x7c, 0x3b, 0x01, 0x21, 0x78, 0x87,
+    0xd4, 0x00, 0x46, 0x57, 0x9f, 0xd3, 0x27, 0x52, 0x4c, 0x36, 0x02, 0xe7, 0xa0, 0xc4, 0xc8, 0x9e,
+    0xea, 0xbf, 0x8a, 0xd2, 0x40, 0xc7, 0x38, 0xb5, 0xa3, 0xf7, 0xf2, 0xce, 0xf9, 0x61, 0x15, 0xa1,
+    0xe0, 0xae, 0x5d, 0xa4, 0x9b, 0x34, 0x1a, 0x55, 0xad, 0x93, 0x32, 0x30, 0xf5, 0x8c, 0xb1, 0xe3,
+    0x1d, 0xf6, 0xe2, 0x2e, 0x82, 0x66, 0xca, 0x60, 0xc0, 0x29, 0x23, 0xab, 0x0d, 0x53, 0x4e, 0x6f,
+    0xd5, 0xdb, 0x37, 0x45, 0xde, 0xfd, 0x8e, 0x2f, 0x03, 0xff, 0x6a, 0x72, 0x6d, 0x6c, 0x5b, 0x51,
+    0x8d, 0x1b, 0xaf, 0x92, 0xbb, 0xdd, 0xbc, 0x7f, 0x11, 0xd9, 0x5c, 0x41, 0x1f, 0x10, 0x5a, 0xd8,
+    0x0a, 0xc1, 0x31, 0x88, 0xa5, 0xcd, 0x7b, 0xbd, 0x2d, 0x74, 0xd0, 0x12, 0xb8, 0xe5, 0xb4, 0xb0,
+    0x89, 0x69, 0x97, 0x4a, 0x0c, 0x96, 0x77, 0x7e, 0x65, 0xb9, 0xf1, 0x09, 0xc5, 0x6e, 0xc6, 0x84,
+    0x18, 0xf0, 0x7d, 0xec, 0x3a, 0xdc, 0x4d, 0x20, 0x79, 0xee, 0x5f, 0x3e, 0xd7, 0xcb, 0x39, 0x48};
+
+static inline uint32_t load_be32(const uint8_t *p)
+{
+    return ((uint32_t)p[0] << 24) | ((uint32_t)p[1] << 16) | ((uint32_t)p[2] << 8) | p[3];
+}
+
+// 密钥扩展（标量实现，每个密钥仅执行一次）
+static inline void sm4_expand_key(const uint8_t *key, uint32_t rk[32])
+{
+    uint32_t k[4];
+    for (int i = 0; i < 4; i++)
+        k[i] = load_be32(key + 4 * i) ^ FK[i];
+
+    for (int i = 0; i < 32; i++)
+    {
+        uint32_t t = k[1] ^ k[2] ^ k[3] ^ SM4_CK(i);
+        t = ((uint32_t)SBOX[t >> 24] << 24) | ((uint32_t)SBOX[(t >> 16) & 0xff] << 16) |
+            ((uint32_t)SBOX[(t >> 8) & 0xff] << 8) | SBOX[t & 0xff];
+        rk[i] = k[0] ^ t ^ ROTL32(t, 13) ^ ROTL32(t, 23);
+        k[0] = k[1];
+        k[1] = k[2];
+        k[2] = k[3];
+        k[3] = rk[i];
+    }
+}
+
+// 4x4 字矩阵转置（分组 <-> 列），用于 128 位 SIMD 内核
+#define TRANSPOSE4(a, b, c, d)                   \
+    do                                           \
+    {                                            \
+        __m128i t0 = _mm_unpacklo_epi32(a, b);   \
+        __m128i t1 = _mm_unpacklo_epi32(c, d);   \
+        __m128i t2 = _mm_unpackhi_epi32(a, b);   \
+        __m128i t3 = _mm_unpackhi_epi32(c, d);   \
+        a = _mm_unpacklo_epi64(t0, t1);          \
+        b = _mm_unpackhi_epi64(t0, t1);          \
+        c = _mm_unpacklo_epi64(t2, t3);          \
+        d = _mm_unpackhi_epi64(t2, t3);          \
+    } while (0)
+
+/*
+ * 各 128 位通道内独立的 4x4 字矩阵转置（同 TRANSPOSE4）
+ * 连续载入的 4 个寄存器转置后，第 j 个寄存器即为全部分组的 X_j，
+ * 只是分组在列内的顺序被交错；以同样方式转置回去即可还原，
+ * 从而以普通的连续读写代替逐字的 gather/scatter
+ */
+#define TRANSPOSE4_512(a, b, c, d)                  \
+    do                                              \
+    {                                               \
+        __m512i t0 = _mm512_unpacklo_epi32(a, b);   \
+        __m512i t1 = _mm512_unpacklo_epi32(c, d);   \
+        __m512i t2 = _mm512_unpackhi_epi32(a, b);   \
+        __m512i t3 = _mm512_unpackhi_epi32(c, d);   \
+        a = _mm512_unpacklo_epi64(t0, t1);          \
+        b = _mm512_unpackhi_epi64(t0, t1);          \
+        c = _mm512_unpacklo_epi64(t2, t3);          \
+        d = _mm512_unpackhi_epi64(t2, t3);          \
+    } while (0)
+
+#define TRANSPOSE4_256(a, b, c, d)                  \
+    do                                              \
+    {                                               \
+        __m256i t0 = _mm256_unpacklo_epi32(a, b);   \
+        __m256i t1 = _mm256_unpacklo_epi32(c, d);   \
+        __m256i t2 = _mm256_unpackhi_epi32(a, b);   \
+        __m256i t3 = _mm256_unpackhi_epi32(c, d);   \
+        a = _mm256_unpacklo_epi64(t0, t1);          \
+        b = _mm256_unpackhi_epi64(t0, t1);          \
+        c = _mm256_unpacklo_epi64(t2, t3);          \
+        d = _mm256_unpackhi_epi64(t2, t3);          \
+    } while (0)
+
+// 单次调用处理 width 个分组的并行内核
+typedef void (*sm4_kernel_fn)(const uint32_t rk[32], const uint8_t *in, uint8_t *out);
+
+static inline void sm4_ecb_run(sm4_kernel_fn kernel, size_t width, const uint32_t rk[32],
+                               const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    while (nblocks >= width)
+    {
+        kernel(rk, in, out);
+        in += 16 * width;
+        out += 16 * width;
+        nblocks -= width;
+    }
+
+    // 不足一批的尾部使用临时缓冲区补齐
+    if (nblocks)
+    {
+        uint8_t buf[256] = {0};
+        memcpy(buf, in, nblocks * 16);
+        kernel(rk, buf, buf);
+        memcpy(out, buf, nblocks * 16);
+    }
+}
+
+// 解密轮密钥：加密轮密钥逆序
+static inline void sm4_reverse_keys(const uint32_t rk[32], uint32_t rrk[32])
+{
+    for (int i = 0; i < 32; i++)
+        rrk[i] = rk[31 - i];
+}
+
+#endif
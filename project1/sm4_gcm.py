@@ -1,9 +1,193 @@
 # SM4-GCM 工作模式软件优化实现
 
+import functools
+import hmac
+import os
 import struct
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional
-from sm4 import OptimizedSM4_for_T_Table, SM4_AESNI_Optimized, SM4_ModernISA_Optimized
+from sm4 import (OptimizedSM4_for_T_Table, SM4_AESNI_Optimized, SM4_ModernISA_Optimized,
+                 _NP_MIN_BLOCKS, _PARALLEL_MIN_BLOCKS, _cached_round_keys)
+import sm4_native
+
+# 可选的NumPy向量化异或（未安装时回退到整数异或）
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 可选的Numba GHASH内核（本地无进位乘法内核不可用时使用）
+try:
+    from sm4_ghash_numba import _gfmul_u64x2, _ghash_blocks as _jit_ghash_blocks
+except ImportError:
+    _gfmul_u64x2 = _jit_ghash_blocks = None
+
+# 16字节分组与两个64位整数之间的转换；乘数按小端解析，参见_ghash_optimized_gfmul
+_BE_QQ = struct.Struct('>QQ')
+_LE_QQ = struct.Struct('<QQ')
+
+
+def _xor_bytes(data: bytes, keystream: bytes) -> bytes:
+    """data与keystream的前len(data)字节异或，keystream可以更长"""
+    n = len(data)
+    if np is not None and n >= 16 * _NP_MIN_BLOCKS:
+        return np.bitwise_xor(np.frombuffer(data, dtype=np.uint8),
+                              np.frombuffer(keystream, dtype=np.uint8, count=n)).tobytes()
+    # 短数据时整数异或的固定开销更小
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(keystream[:n], 'big')).to_bytes(n, 'big')
+
+
+def _fast_ghash(h: bytes, data: bytes, y: bytes = bytes(16)) -> Optional[bytes]:
+    """
+    对data中的完整分组依次计算 y = (y ^ block) · h，末尾不足16字节的部分忽略
+
+    Returns:
+        16字节结果；本地内核与Numba均不可用时返回None，由调用方走纯Python路径
+    """
+    if sm4_native.ghash_available():
+        if len(data) >= 16 * _GHASH_THREAD_MIN_BLOCKS:
+            executor = _ghash_executor()
+            if executor is not None:
+                return _threaded_ghash(h, data, y, executor)
+        return sm4_native.ghash_blocks(h, data, y)
+    if _jit_ghash_blocks is not None:
+        hl, hh = _LE_QQ.unpack(h)
+        words = np.frombuffer(data, dtype='>u8', count=len(data) // 16 * 2).astype(np.uint64)
+        return _BE_QQ.pack(*_jit_ghash_blocks(words, *_BE_QQ.unpack(y), hh, hl))
+    return None
+
+
+# 标签掩码与GCTR同批计算的最大数据长度，更长时拼接复制的开销超过省下的一次分组加密
+_FUSED_TAG_MASK_MAX = 16 * _NP_MIN_BLOCKS
+
+# 多线程GHASH的最小分组数（64KB），更短的数据线程调度开销超过收益
+_GHASH_THREAD_MIN_BLOCKS = 1 << 12
+
+# 多线程GHASH的线程数
+_GHASH_THREADS = min(os.cpu_count() or 1, 4)
+
+
+@functools.lru_cache(maxsize=1)
+def _ghash_executor() -> Optional[ThreadPoolExecutor]:
+    """
+    分段GHASH的线程池，最多4个线程
+
+    本地内核经ctypes调用时释放GIL，各段可真正并行；单核机器上返回None
+    """
+    if _GHASH_THREADS < 2:
+        return None
+    return ThreadPoolExecutor(max_workers=_GHASH_THREADS)
+
+
+@functools.lru_cache(maxsize=64)
+def _native_h_power(h: bytes, m: int) -> bytes:
+    """H^m（m >= 1），按小端编码，平方-乘法求得"""
+    result = None
+    while True:
+        if m & 1:
+            result = h if result is None else sm4_native.ghash_gfmul(result[::-1], h)[::-1]
+        m >>= 1
+        if not m:
+            return result
+        h = sm4_native.ghash_square(h)
+
+
+def _threaded_ghash(h: bytes, data: bytes, y: bytes, executor: ThreadPoolExecutor,
+                    nthreads: int = _GHASH_THREADS) -> bytes:
+    """
+    分段并行GHASH，数据分为nthreads段
+
+    第t段以零为初值独立求 P_t = Σ X_i·H^(段尾-i+1)（首段带入初值y），
+    再依次合并 y = y·H^(第t段块数) ^ P_t，结果与逐块计算一致
+    """
+    # bytes以外的只读缓冲区在ghash_blocks中每段都要复制，先统一转换一次
+    if not isinstance(data, bytes) and memoryview(data).readonly:
+        data = bytes(data)
+    num_blocks = len(data) // 16
+    step = -(-num_blocks // nthreads)
+    zero = bytes(16)
+    futures = [
+        executor.submit(sm4_native.ghash_blocks, h, data, y if i == 0 else zero,
+                        i, min(i + step, num_blocks))
+        for i in range(0, num_blocks, step)
+    ]
+    y = futures[0].result()
+    for i, future in zip(range(step, num_blocks, step), futures[1:]):
+        h_power = _native_h_power(h, min(step, num_blocks - i))
+        y = _xor_bytes(sm4_native.ghash_gfmul(y, h_power), future.result())
+    return y
+
+
+# 比特展开掩码：第s步将每s位一组拉开为间隔s位，7步后相邻比特间插入一个0
+_SPREAD_MASKS = tuple(
+    (s, sum(((1 << s) - 1) << i for i in range(0, 256, 2 * s)))
+    for s in (64, 32, 16, 8, 4, 2, 1)
+)
+
+
+def _gf_square(x: int) -> int:
+    """
+    GF(2^128)平方 x² mod (x^128 + x^7 + x^2 + x + 1)
+
+    特征2下交叉项成对抵消，(Σa_i·x^i)² = Σa_i·x^(2i)，只需把比特间隔展开后约简
+    """
+    for shift, mask in _SPREAD_MASKS:
+        x = (x | (x << shift)) & mask
+    high = x >> 128
+    x = (x & ((1 << 128) - 1)) ^ high ^ (high << 1) ^ (high << 2) ^ (high << 7)
+    high = x >> 128
+    return (x ^ high ^ (high << 1) ^ (high << 2) ^ (high << 7)) & ((1 << 128) - 1)
+
+
+# 单次生成的计数器块数上限（1MiB），更长的数据分段生成，限制缓存常数的大小
+_COUNTER_LANES_MAX = 1 << 16
+
+
+@functools.lru_cache(maxsize=None)
+def _counter_lanes(m: int) -> Tuple[int, int]:
+    """
+    m（2的幂）个128位通道的常数：R的每个通道为1，C自高位起第i个通道为i
+
+    只按2的幂缓存，更少的通道数取高位部分（右移）即可，缓存项数有界
+    """
+    r = int.from_bytes((bytes(15) + b'\x01') * m, 'big')
+    c = int.from_bytes(b''.join(i.to_bytes(16, 'big') for i in range(m)), 'big')
+    return r, c
+
+
+def _counter_blocks(icb: bytes, n: int) -> bytes:
+    """
+    生成icb, icb+1, ..., icb+n-1共n个大端计数器块
+
+    按块数特化：全部计数器一次算出 base·R + C，再整体转为字节，
+    每个通道互不进位，省去逐块的加法与to_bytes
+    """
+    base = int.from_bytes(icb, 'big')
+    if base + n > 1 << 128:
+        raise OverflowError("计数器超出128位")
+    
+    out = []
+    for start in range(0, n, _COUNTER_LANES_MAX):
+        k = min(_COUNTER_LANES_MAX, n - start)
+        m = 1 << (k - 1).bit_length()
+        r, c = _counter_lanes(m)
+        shift = 128 * (m - k)
+        out.append(((base + start) * (r >> shift) + (c >> shift)).to_bytes(16 * k, 'big'))
+    return b''.join(out)
+
+
+@functools.lru_cache(maxsize=1)
+def _overlap_executor() -> Optional[ThreadPoolExecutor]:
+    """
+    解密时与GHASH重叠执行GCTR的后台线程
+
+    本地内核经ctypes调用、Numba内核以nogil编译，执行期间均释放GIL；
+    单核机器上重叠没有收益，返回None
+    """
+    if (os.cpu_count() or 1) < 2:
+        return None
+    return ThreadPoolExecutor(max_workers=1)
 
 
 class SM4_GCM_Base:
@@ -32,11 +216,20 @@ class SM4_GCM_Base:
         else:
             from sm4 import SM4
             self.sm4 = SM4()
+            # encrypt_block使用预先扩展的轮密钥
+            self.sm4.schedule_key(key)
         
         # GCM参数
         self.block_size = 16
         self.tag_size = 16
         
+        # Hash子密钥H = E_K(0^128)：密钥在构造时即固定，只需计算一次
+        self.h = self._sm4_encrypt_block(b'\x00' * 16)
+        
+        # 标签掩码E_K(J0)按IV缓存。GCM要求同一密钥下每条消息使用不同的IV，
+        # 因此只有同一IV的消息被再次处理时（如加密后立即校验解密）才会命中
+        self._tag_mask = functools.lru_cache(maxsize=256)(self._compute_tag_mask)
+        
         # 预计算GF(2^128)乘法表
         self._precompute_galois_tables()
     
@@ -51,6 +244,31 @@ class SM4_GCM_Base:
         else:
             raise NotImplementedError("SM4实现缺少加密方法")
     
+    def _sm4_encrypt_blocks(self, data: bytes) -> bytes:
+        """统一的SM4批量加密接口：一次调用ECB加密长度为16倍数的连续数据"""
+        if hasattr(self.sm4, '_parallel_encrypt_blocks_bulk'):
+            return self.sm4._parallel_encrypt_blocks_bulk(data, _cached_round_keys(self.key))
+        if hasattr(self.sm4, 'encrypt_ecb_raw'):
+            return self.sm4.encrypt_ecb_raw(data, _cached_round_keys(self.key))
+        # 其余实现只有带PKCS7填充的接口，截去末尾的填充分组即为ECB结果
+        return self.sm4.encrypt(data, self.key)[:len(data)]
+    
+    def _compute_tag_mask(self, iv: bytes) -> bytes:
+        """标签掩码E_K(J0)，J0 = IV || 0^31 || 1"""
+        return self._sm4_encrypt_block(iv + b'\x00\x00\x00\x01')
+    
+    def _gctr_tag_mask(self, gctr, iv: bytes, data: bytes) -> Tuple[bytes, bytes]:
+        """
+        返回(GCTR(J0+1, data), 标签掩码E_K(J0))
+        
+        数据从J0+1开始计数，J0只用于标签。短数据把J0并入同一批计数器块加密，
+        省去一次单独的分组加密；长数据改用按IV缓存的掩码，避免拼接复制
+        """
+        if len(data) <= _FUSED_TAG_MASK_MAX:
+            stream = gctr(iv + b'\x00\x00\x00\x01', b'\x00' * 16 + data)
+            return stream[16:], stream[:16]
+        return gctr(iv + b'\x00\x00\x00\x02', data), self._tag_mask(iv)
+    
     def _precompute_galois_tables(self):
         """预计算GF(2^128)域上的乘法表用于加速GHASH"""
         # GF(2^128)的不可约多项式: x^128 + x^7 + x^2 + x + 1
@@ -75,18 +293,21 @@ class SM4_GCM_Base:
         Returns:
             x * y mod (x^128 + x^7 + x^2 + x + 1)
         """
-        result = 0
+        # 4位窗口：预计算x·0..x·15，每次移入y的一个半字节，不按位分支
+        tab = [0, x, x << 1, (x << 1) ^ x]
+        tab += [(x << 2) ^ t for t in tab]
+        tab += [(x << 3) ^ t for t in tab]
         
-        for i in range(128):
-            if y & (1 << i):
-                result ^= x << i
-        
-        # 模约简
-        for i in range(127, -1, -1):
-            if result & (1 << (128 + i)):
-                result ^= (0x87 << i)  # x^128 + x^7 + x^2 + x + 1的表示
-        
-        return result & ((1 << 128) - 1)
+        result = 0
+        for shift in range(124, -4, -4):
+            result = (result << 4) ^ tab[(y >> shift) & 0xF]
+        
+        # 模约简：x^128 ≡ x^7 + x^2 + x + 1 (0x87)，高128位折叠两次即可
+        mask = (1 << 128) - 1
+        high = result >> 128
+        result = (result & mask) ^ high ^ (high << 1) ^ (high << 2) ^ (high << 7)
+        high = result >> 128
+        return (result ^ high ^ (high << 1) ^ (high << 2) ^ (high << 7)) & mask
     
     def _ghash_optimized_gfmul(self, x_bytes: bytes, y_bytes: bytes) -> bytes:
         """
@@ -98,27 +319,17 @@ class SM4_GCM_Base:
         Returns:
             16字节乘法结果
         """
+        # 本地无进位乘法内核或Numba内核可用时直接调用，结果逐位一致
+        if sm4_native.ghash_available():
+            return sm4_native.ghash_gfmul(x_bytes, y_bytes)
+        if _gfmul_u64x2 is not None:
+            yl, yh = _LE_QQ.unpack(y_bytes)
+            return _BE_QQ.pack(*_gfmul_u64x2(*_BE_QQ.unpack(x_bytes), yh, yl))
+        
+        # y的第i个字节(自高位起)与x<<8i相乘，等价于y按小端解析后的普通乘法
         x = int.from_bytes(x_bytes, 'big')
-        y = int.from_bytes(y_bytes, 'big')
-        
-        # 分解为8位组件进行查表计算
-        result = 0
-        
-        for i in range(16):
-            byte_val = (y >> (8 * (15 - i))) & 0xFF
-            if byte_val:
-                shifted_x = x << (8 * i)
-                # 使用预计算的约简表
-                for j in range(8):
-                    if byte_val & (1 << j):
-                        result ^= shifted_x << j
-        
-        # 约简结果到128位
-        for i in range(255, 127, -1):
-            if result & (1 << i):
-                result ^= (0x87 << (i - 128))
-        
-        return (result & ((1 << 128) - 1)).to_bytes(16, 'big')
+        y = int.from_bytes(y_bytes, 'little')
+        return self._ghash_gfmul(x, y).to_bytes(16, 'big')
     
     def _ghash(self, auth_data: bytes, ciphertext: bytes, h: bytes) -> bytes:
         """
@@ -132,34 +343,34 @@ class SM4_GCM_Base:
         Returns:
             16字节认证标签
         """
-        # 填充数据到16字节边界
-        auth_len = len(auth_data)
-        cipher_len = len(ciphertext)
-        
-        # 填充auth_data
-        if auth_len % 16:
-            auth_data += b'\x00' * (16 - (auth_len % 16))
-        
-        # 填充ciphertext
-        if cipher_len % 16:
-            ciphertext += b'\x00' * (16 - (cipher_len % 16))
-        
-        # 连接数据
-        data = auth_data + ciphertext
-        
-        # 添加长度信息
-        len_block = struct.pack('>QQ', auth_len * 8, cipher_len * 8)
-        data += len_block
+        # 按 A || 0* || C || 0* || len(A) || len(C) 的顺序处理：A与C的完整分组直接
+        # 在原缓冲区上计算，只有不足16字节的尾部补零另存，不拼接整段数据
+        segments = []
+        for part in (auth_data, ciphertext):
+            tail = len(part) % 16
+            segments.append(part)
+            segments.append(part[-tail:] + bytes(16 - tail) if tail else b'')
+        segments.append(struct.pack('>QQ', len(auth_data) * 8, len(ciphertext) * 8))
+        
+        # GHASH计算，完整分组的乘法链在本地内核中完成
+        y = bytes(16)
+        for segment in segments:
+            y = _fast_ghash(h, segment, y)
+            if y is None:
+                break
+        else:
+            return y
         
-        # GHASH计算
-        y = b'\x00' * 16
+        # 纯Python路径：状态保持为128位整数，异或与乘法均不经过bytes
+        # （乘数按小端解析，与_ghash_optimized_gfmul一致）
+        h_int = int.from_bytes(h, 'little')
+        y = 0
         
-        for i in range(0, len(data), 16):
-            block = data[i:i+16]
-            y = bytes(a ^ b for a, b in zip(y, block))
-            y = self._ghash_optimized_gfmul(y, h)
+        for segment in segments:
+            for i in range(0, len(segment) - 15, 16):
+                y = self._ghash_gfmul(y ^ int.from_bytes(segment[i:i+16], 'big'), h_int)
         
-        return y
+        return y.to_bytes(16, 'big')
     
     def _gctr(self, icb: bytes, plaintext: bytes) -> bytes:
         """
@@ -175,22 +386,12 @@ class SM4_GCM_Base:
         if not plaintext:
             return b''
         
-        ciphertext = bytearray()
-        counter = int.from_bytes(icb, 'big')
+        counters = _counter_blocks(icb, (len(plaintext) + 15) // 16)
         
-        for i in range(0, len(plaintext), 16):
-            # 生成计数器块
-            counter_block = (counter + i // 16).to_bytes(16, 'big')
-            
-            # 加密计数器块
-            encrypted_counter = self._sm4_encrypt_block(counter_block)
-            
-            # 与明文异或
-            chunk = plaintext[i:i+16]
-            for j in range(len(chunk)):
-                ciphertext.append(chunk[j] ^ encrypted_counter[j])
+        # 先生成全部密钥流，再与明文一次性异或
+        keystream = b''.join(self._sm4_encrypt_block(counters[i:i+16]) for i in range(0, len(counters), 16))
         
-        return bytes(ciphertext)
+        return _xor_bytes(plaintext, keystream)
     
     def encrypt(self, iv: bytes, plaintext: bytes, auth_data: bytes = b'') -> Tuple[bytes, bytes]:
         """
@@ -207,22 +408,17 @@ class SM4_GCM_Base:
         if len(iv) != 12:
             raise ValueError("推荐使用12字节IV")
         
-        # 生成Hash子密钥
-        h = self._sm4_encrypt_block(b'\x00' * 16)
-        
-        # 构造初始计数器
-        icb = iv + b'\x00\x00\x00\x01'
+        # Hash子密钥（构造时已计算）
+        h = self.h
         
-        # GCTR加密
-        ciphertext = self._gctr(icb, plaintext)
+        # GCTR加密，数据从J0+1开始计数
+        ciphertext, tag_mask = self._gctr_tag_mask(self._gctr, iv, plaintext)
         
         # 计算认证标签
         s = self._ghash(auth_data, ciphertext, h)
         
         # 计算最终标签
-        tag_icb = iv + b'\x00\x00\x00\x01'
-        tag_mask = self._sm4_encrypt_block(tag_icb)
-        tag = bytes(a ^ b for a, b in zip(s, tag_mask))
+        tag = _xor_bytes(s, tag_mask)
         
         return ciphertext, tag
     
@@ -245,29 +441,28 @@ class SM4_GCM_Base:
         if len(iv) != 12:
             raise ValueError("推荐使用12字节IV")
         
-        # 生成Hash子密钥
-        h = self._sm4_encrypt_block(b'\x00' * 16)
+        # Hash子密钥（构造时已计算）
+        h = self.h
+        
+        # GCTR解密 (与加密相同)，标签掩码随之得到
+        plaintext, tag_mask = self._gctr_tag_mask(self._gctr, iv, ciphertext)
         
         # 验证认证标签
         s = self._ghash(auth_data, ciphertext, h)
-        tag_icb = iv + b'\x00\x00\x00\x01'
-        tag_mask = self._sm4_encrypt_block(tag_icb)
-        expected_tag = bytes(a ^ b for a, b in zip(s, tag_mask))
+        expected_tag = _xor_bytes(s, tag_mask)
         
-        if tag != expected_tag:
+        # 常数时间比较，避免逐字节提前返回泄露匹配长度
+        if not hmac.compare_digest(tag, expected_tag):
             raise ValueError("认证标签验证失败")
         
-        # GCTR解密 (与加密相同)
-        icb = iv + b'\x00\x00\x00\x01'
-        plaintext = self._gctr(icb, ciphertext)
-        
+        # 认证通过后才返回明文
         return plaintext
 
 
 class SM4_GCM_Optimized(SM4_GCM_Base):
     """优化的SM4-GCM实现"""
     
-    def __init__(self, key: bytes, use_optimization='ttable'):
+    def __init__(self, key: bytes, use_optimization='ttable', debug: bool = False):
         super().__init__(key, use_optimization)
         
         # 预计算优化表
@@ -276,25 +471,73 @@ class SM4_GCM_Optimized(SM4_GCM_Base):
         # 支持的优化特性
         self.supports_parallel = True
         self.supports_aesni_gcm = hasattr(self.sm4, 'aesni_supported')
+        
+        if debug:
+            self._self_test_ghash()
     
     def _precompute_ghash_tables(self):
         """预计算GHASH优化表"""
         # 预计算H的幂次
-        h_zero = self._sm4_encrypt_block(b'\x00' * 16)
+        h_zero = self.h
         
-        self.h_powers = [b'\x00' * 16]  # H^0 = 0
+        self.h_powers = [b'\x01' + b'\x00' * 15]  # H^0 = 1（乘数按小端编码）
         self.h_powers.append(h_zero)    # H^1
         
         # 预计算H^2, H^3, ..., H^8用于并行处理
-        for i in range(2, 9):
-            hi = self._ghash_optimized_gfmul(self.h_powers[i-1], h_zero)
-            self.h_powers.append(hi)
+        self._extend_h_powers(8)
+        
+        # 4位查表：ghash_table[2*pos]、[2*pos+1]分别对应第pos字节的高/低半字节，
+        # 每项为(该半字节单独构成的分组)·H的128位整数，约简已折叠进表中
+        # 乘法对第一个操作数线性，每张表只需4次乘法，其余表项由单比特项异或得到
+        self.ghash_table = []
+        for nibble_pos in range(32):
+            table = [0] * 16
+            for bit in range(4):
+                block = bytearray(16)
+                block[nibble_pos // 2] = (1 << bit) << (4 if nibble_pos % 2 == 0 else 0)
+                table[1 << bit] = int.from_bytes(self._ghash_optimized_gfmul(bytes(block), h_zero), 'big')
+            for val in range(3, 16):
+                if val & (val - 1):
+                    table[val] = table[val & -val] ^ table[val & (val - 1)]
+            self.ghash_table.append(table)
+    
+    def _next_h_power(self, power: bytes, h: bytes) -> bytes:
+        """
+        由H^k求H^(k+1)
         
-        # 为查表优化预计算更多值
-        self.ghash_table = {}
-        for i in range(256):
-            key_bytes = i.to_bytes(1, 'big') + b'\x00' * 15
-            self.ghash_table[i] = self._ghash_optimized_gfmul(key_bytes, h_zero)
+        _ghash_optimized_gfmul的第二个操作数按小端解析，H的幂次作为乘数使用，
+        因此同样按小端编码存放（H^1即h本身）
+        """
+        return self._ghash_optimized_gfmul(power[::-1], h)[::-1]
+    
+    def _square_h_power(self, power: bytes) -> bytes:
+        """由H^k求H^(2k)，按小端编码存放"""
+        if sm4_native.ghash_available():
+            return sm4_native.ghash_square(power)
+        return _gf_square(int.from_bytes(power, 'little')).to_bytes(16, 'little')
+    
+    def _extend_h_powers(self, n: int):
+        """
+        将h_powers扩展到H^n并同步h_powers_int
+        
+        偶次幂H^(2k)由H^k平方得到，奇次幂H^(2k+1)由H^(2k)再乘一次H
+        """
+        powers = self.h_powers
+        for k in range(len(powers), n + 1):
+            if k % 2 == 0:
+                powers.append(self._square_h_power(powers[k // 2]))
+            else:
+                powers.append(self._next_h_power(powers[k - 1], powers[1]))
+        self.h_powers_int = [int.from_bytes(p, 'little') for p in powers]
+    
+    def _self_test_ghash(self):
+        """用4KB随机数据核对聚合GHASH与逐块GHASH的结果"""
+        h = self.h_powers[1]
+        data = os.urandom(4096)
+        blocks = [data[i:i+16] for i in range(0, len(data), 16)]
+        for n in (5, 8, 9, 17, len(blocks)):
+            if self._parallel_ghash(blocks[:n], h) != self._sequential_ghash(blocks[:n], h):
+                raise AssertionError(f"并行GHASH自检失败（{n}块）")
     
     def _parallel_ghash(self, data_blocks: List[bytes], h: bytes) -> bytes:
         """
@@ -311,36 +554,42 @@ class SM4_GCM_Optimized(SM4_GCM_Base):
             # 数据量较小，使用标准方法
             return self._sequential_ghash(data_blocks, h)
         
-        # 并行处理多个块
+        # 本地内核按8块聚合、每批只约简一次（H的幂次在内核中按同一乘法推导）
+        y = _fast_ghash(h, b''.join(data_blocks))
+        if y is not None:
+            return y
+        
+        # 每批K(<=8)块：y = (X_0 ^ y)·H^K ^ X_1·H^(K-1) ^ ... ^ X_(K-1)·H
+        hp = self.h_powers_int
         num_blocks = len(data_blocks)
-        y = b'\x00' * 16
+        y = 0
         
-        # 每次处理8个块以充分利用预计算的幂次
         for i in range(0, num_blocks, 8):
             batch = data_blocks[i:i+8]
-            batch_result = b'\x00' * 16
-            
-            # 并行计算这批块的贡献
+            k = len(batch)
+            acc = 0
             for j, block in enumerate(batch):
-                if j < len(self.h_powers) - 1:
-                    contribution = self._ghash_optimized_gfmul(block, self.h_powers[len(batch)-j])
-                    batch_result = bytes(a ^ b for a, b in zip(batch_result, contribution))
-            
-            y = bytes(a ^ b for a, b in zip(y, batch_result))
-            if i + 8 < num_blocks:
-                y = self._ghash_optimized_gfmul(y, self.h_powers[min(8, num_blocks - i - 8)])
+                x = int.from_bytes(block, 'big')
+                if j == 0:
+                    x ^= y
+                acc ^= self._ghash_gfmul(x, hp[k - j])
+            y = acc
         
-        return y
+        return y.to_bytes(16, 'big')
     
     def _sequential_ghash(self, data_blocks: List[bytes], h: bytes) -> bytes:
         """标准顺序GHASH计算"""
-        y = b'\x00' * 16
+        y = _fast_ghash(h, b''.join(data_blocks))
+        if y is not None:
+            return y
+        
+        h_int = int.from_bytes(h, 'little')
+        y = 0
         
         for block in data_blocks:
-            y = bytes(a ^ b for a, b in zip(y, block))
-            y = self._ghash_optimized_gfmul(y, h)
+            y = self._ghash_gfmul(y ^ int.from_bytes(block, 'big'), h_int)
         
-        return y
+        return y.to_bytes(16, 'big')
     
     def _optimized_gctr(self, icb: bytes, plaintext: bytes) -> bytes:
         """
@@ -367,43 +616,16 @@ class SM4_GCM_Optimized(SM4_GCM_Base):
             return self._gctr(icb, plaintext)
     
     def _parallel_gctr(self, icb: bytes, plaintext: bytes, num_blocks: int) -> bytes:
-        """并行GCTR处理"""
-        ciphertext = bytearray()
-        counter_base = int.from_bytes(icb, 'big')
+        """并行GCTR处理：一次生成全部计数器块，整体交给SM4后端批量加密"""
+        counters = _counter_blocks(icb, num_blocks)
         
-        # 每次并行处理4个块
-        for i in range(0, num_blocks, 4):
-            batch_size = min(4, num_blocks - i)
-            
-            # 准备计数器块
-            counter_blocks = []
-            for j in range(batch_size):
-                counter = (counter_base + i + j).to_bytes(16, 'big')
-                counter_blocks.append(counter)
-            
-            # 并行加密计数器块
-            encrypted_counters = self._parallel_encrypt_blocks(counter_blocks)
-            
-            # 与明文异或
-            for j in range(batch_size):
-                block_start = (i + j) * 16
-                block_end = min(block_start + 16, len(plaintext))
-                chunk = plaintext[block_start:block_end]
-                
-                encrypted_counter = encrypted_counters[j]
-                for k in range(len(chunk)):
-                    ciphertext.append(chunk[k] ^ encrypted_counter[k])
-        
-        return bytes(ciphertext)
+        # 与明文一次性异或
+        return _xor_bytes(plaintext, self._sm4_encrypt_blocks(counters))
     
     def _parallel_encrypt_blocks(self, blocks: List[bytes]) -> List[bytes]:
         """并行加密多个块"""
-        # 如果SM4实现支持并行处理
-        if hasattr(self.sm4, '_parallel_encrypt_blocks'):
-            return self.sm4._parallel_encrypt_blocks(blocks)
-        else:
-            # 回退到顺序处理
-            return [self._sm4_encrypt_block(block) for block in blocks]
+        out = self._sm4_encrypt_blocks(b''.join(blocks))
+        return [out[i:i+16] for i in range(0, len(out), 16)]
     
     def encrypt(self, iv: bytes, plaintext: bytes, auth_data: bytes = b'') -> Tuple[bytes, bytes]:
         """
@@ -420,22 +642,17 @@ class SM4_GCM_Optimized(SM4_GCM_Base):
         if len(iv) != 12:
             raise ValueError("推荐使用12字节IV")
         
-        # 生成Hash子密钥
-        h = self._sm4_encrypt_block(b'\x00' * 16)
+        # Hash子密钥（构造时已计算）
+        h = self.h
         
-        # 构造初始计数器
-        icb = iv + b'\x00\x00\x00\x01'
-        
-        # GCTR加密
-        ciphertext = self._optimized_gctr(icb, plaintext)
+        # GCTR加密，数据从J0+1开始计数
+        ciphertext, tag_mask = self._gctr_tag_mask(self._optimized_gctr, iv, plaintext)
         
         # 计算认证标签
         s = self._ghash(auth_data, ciphertext, h)
         
         # 计算最终标签
-        tag_icb = iv + b'\x00\x00\x00\x01'
-        tag_mask = self._sm4_encrypt_block(tag_icb)
-        tag = bytes(a ^ b for a, b in zip(s, tag_mask))
+        tag = _xor_bytes(s, tag_mask)
         
         return ciphertext, tag
     
@@ -458,35 +675,37 @@ class SM4_GCM_Optimized(SM4_GCM_Base):
         if len(iv) != 12:
             raise ValueError("推荐使用12字节IV")
         
-        # 生成Hash子密钥
-        h = self._sm4_encrypt_block(b'\x00' * 16)
+        # Hash子密钥（构造时已计算）
+        h = self.h
+        
+        # 大消息在多核上让GCTR解密与GHASH同时进行：两者只读同一段密文，互不依赖
+        executor = _overlap_executor() if len(ciphertext) >= 16 * _PARALLEL_MIN_BLOCKS else None
+        if executor is not None:
+            plaintext_future = executor.submit(self._gctr_tag_mask, self._optimized_gctr, iv, ciphertext)
         
         # 验证认证标签
         s = self._ghash(auth_data, ciphertext, h)
-        tag_icb = iv + b'\x00\x00\x00\x01'
-        tag_mask = self._sm4_encrypt_block(tag_icb)
-        expected_tag = bytes(a ^ b for a, b in zip(s, tag_mask))
         
-        if tag != expected_tag:
-            raise ValueError("认证标签验证失败")
+        # GCTR解密 (与加密相同)，标签掩码随之得到
+        if executor is not None:
+            plaintext, tag_mask = plaintext_future.result()
+        else:
+            plaintext, tag_mask = self._gctr_tag_mask(self._optimized_gctr, iv, ciphertext)
+        expected_tag = _xor_bytes(s, tag_mask)
         
-        # GCTR解密 (与加密相同)
-        icb = iv + b'\x00\x00\x00\x01'
-        plaintext = self._optimized_gctr(icb, ciphertext)
+        # 常数时间比较，避免逐字节提前返回泄露匹配长度
+        if not hmac.compare_digest(tag, expected_tag):
+            raise ValueError("认证标签验证失败")
         
+        # 认证通过后才返回明文
         return plaintext
 
 
 class SM4_GCM_Advanced(SM4_GCM_Optimized):
     """高级优化的SM4-GCM实现"""
     
-    def __init__(self, key: bytes, use_optimization='ttable'):
-        super().__init__(key, use_optimization)
-        
-        # 高级优化特性
-        self.cache_size = 1024  # 缓存大小
-        self.ghash_cache = {}   # GHASH结果缓存
-        self.counter_cache = {} # 计数器加密缓存
+    def __init__(self, key: bytes, use_optimization='ttable', debug: bool = False):
+        super().__init__(key, use_optimization, debug)
         
         # 预计算更多优化表
         self._precompute_advanced_tables()
@@ -496,27 +715,12 @@ class SM4_GCM_Advanced(SM4_GCM_Optimized):
         # 预计算常用IV的初始化向量
         self.common_ivs = {}
         
-        # 预计算H的更多幂次用于更大的并行度
-        h = self._sm4_encrypt_block(b'\x00' * 16)
-        
         # 扩展到H^16以支持更大的并行处理
-        while len(self.h_powers) < 17:
-            next_power = self._ghash_optimized_gfmul(self.h_powers[-1], h)
-            self.h_powers.append(next_power)
-        
-        # 预计算字节级别的GHASH表
-        self.byte_ghash_tables = []
-        for byte_pos in range(16):
-            table = {}
-            for val in range(256):
-                block = bytearray(16)
-                block[byte_pos] = val
-                table[val] = self._ghash_optimized_gfmul(bytes(block), h)
-            self.byte_ghash_tables.append(table)
+        self._extend_h_powers(16)
     
     def _ultra_fast_ghash(self, data_blocks: List[bytes], h: bytes) -> bytes:
         """
-        超快速GHASH实现，使用字节级查表
+        超快速GHASH实现，使用4位查表
         
         Args:
             data_blocks: 数据块列表
@@ -525,27 +729,59 @@ class SM4_GCM_Advanced(SM4_GCM_Optimized):
         Returns:
             GHASH结果
         """
-        if len(data_blocks) == 0:
-            return b'\x00' * 16
+        return self._ghash_update(b'\x00' * 16, b''.join(data_blocks), h)
+    
+    def _ghash_update(self, y: bytes, data: bytes, h: bytes) -> bytes:
+        """
+        将data按16字节分组折叠进GHASH状态y，末尾不足一组的部分补零
         
-        # 使用字节级查表加速
-        result = b'\x00' * 16
+        Args:
+            y: 当前GHASH状态
+            data: 待处理数据
+            h: Hash子密钥
+            
+        Returns:
+            新的GHASH状态
+        """
+        if len(data) % 16:
+            data += b'\x00' * (16 - len(data) % 16)
         
-        for block in data_blocks:
+        result = _fast_ghash(h, data, y)
+        if result is not None:
+            return result
+        
+        # 使用4位查表加速：每块32次查表与整数异或
+        tables = list(zip(self.ghash_table[0::2], self.ghash_table[1::2]))
+        result = int.from_bytes(y, 'big')
+        view = memoryview(data)
+        
+        for i in range(0, len(data), 16):
             # 与当前结果异或
-            result = bytes(a ^ b for a, b in zip(result, block))
-            
-            # 使用预计算的字节表快速计算GF乘法
-            new_result = bytearray(16)
-            for byte_pos in range(16):
-                byte_val = result[byte_pos]
-                contribution = self.byte_ghash_tables[byte_pos][byte_val]
-                for i in range(16):
-                    new_result[i] ^= contribution[i]
+            state = (result ^ int.from_bytes(view[i:i + 16], 'big')).to_bytes(16, 'big')
             
-            result = bytes(new_result)
+            result = 0
+            for (high_table, low_table), byte_val in zip(tables, state):
+                result ^= high_table[byte_val >> 4] ^ low_table[byte_val & 0xF]
         
-        return result
+        return result.to_bytes(16, 'big')
+    
+    def _gctr_ghash_step(self, chunk: bytes, counter: int, y: bytes,
+                         h: bytes) -> Tuple[bytes, int, bytes]:
+        """
+        对一个数据块完成GCTR加密并把密文折叠进GHASH状态，数据只经过一遍
+        
+        Args:
+            chunk: 明文块，除流的最后一块外长度须为16的倍数
+            counter: 当前计数器值
+            y: 当前GHASH状态
+            h: Hash子密钥
+            
+        Returns:
+            (密文块, 下一个计数器值, 新的GHASH状态)
+        """
+        cipher_chunk = self._optimized_gctr(counter.to_bytes(16, 'big'), chunk)
+        y = self._ghash_update(y, cipher_chunk, h)
+        return cipher_chunk, counter + (len(chunk) + 15) // 16, y
     
     def encrypt_stream(self, iv: bytes, plaintext_stream, auth_data: bytes = b'', 
                       chunk_size: int = 8192) -> Tuple[bytes, bytes]:
@@ -565,86 +801,52 @@ class SM4_GCM_Advanced(SM4_GCM_Optimized):
             raise ValueError("推荐使用12字节IV")
         
         # 初始化
-        h = self._sm4_encrypt_block(b'\x00' * 16)
-        icb = iv + b'\x00\x00\x00\x01'
+        h = self.h
+        icb = iv + b'\x00\x00\x00\x02'  # J0+1，J0只用于标签掩码
         
         ciphertext_chunks = []
-        all_cipher_blocks = []
         counter = int.from_bytes(icb, 'big')
         
         # 处理认证数据
-        auth_blocks = []
-        if auth_data:
-            # 填充auth_data到16字节边界
-            auth_len = len(auth_data)
-            if auth_len % 16:
-                auth_data += b'\x00' * (16 - (auth_len % 16))
-            
-            for i in range(0, len(auth_data), 16):
-                auth_blocks.append(auth_data[i:i+16])
-        
-        # 流式处理明文
-        total_plaintext_len = 0
+        y = self._ghash_update(b'\x00' * 16, auth_data, h)
         
         if hasattr(plaintext_stream, 'read'):
             # 文件对象
-            while True:
-                chunk = plaintext_stream.read(chunk_size)
-                if not chunk:
-                    break
-                
-                total_plaintext_len += len(chunk)
-                cipher_chunk = self._process_chunk(chunk, counter)
-                ciphertext_chunks.append(cipher_chunk)
-                
-                # 收集密文块用于GHASH
-                for i in range(0, len(cipher_chunk), 16):
-                    block = cipher_chunk[i:i+16]
-                    if len(block) < 16:
-                        block += b'\x00' * (16 - len(block))
-                    all_cipher_blocks.append(block)
-                
-                counter += (len(chunk) + 15) // 16
-        else:
-            # 可迭代对象
-            for chunk in plaintext_stream:
-                total_plaintext_len += len(chunk)
-                cipher_chunk = self._process_chunk(chunk, counter)
+            plaintext_stream = iter(functools.partial(plaintext_stream.read, chunk_size), b'')
+        
+        # 流式处理明文：每块加密后立即折叠进GHASH
+        # 不足16字节的尾部留到下一块，计数器与GHASH按分组连续推进，只在流结束时补零一次
+        total_plaintext_len = 0
+        carry = b''
+        
+        for chunk in plaintext_stream:
+            if not chunk:
+                continue
+            total_plaintext_len += len(chunk)
+            if carry:
+                chunk = carry + chunk
+            aligned = len(chunk) - len(chunk) % 16
+            carry = chunk[aligned:]
+            if aligned:
+                cipher_chunk, counter, y = self._gctr_ghash_step(chunk[:aligned], counter, y, h)
                 ciphertext_chunks.append(cipher_chunk)
-                
-                # 收集密文块用于GHASH
-                for i in range(0, len(cipher_chunk), 16):
-                    block = cipher_chunk[i:i+16]
-                    if len(block) < 16:
-                        block += b'\x00' * (16 - len(block))
-                    all_cipher_blocks.append(block)
-                
-                counter += (len(chunk) + 15) // 16
+        
+        if carry:
+            cipher_chunk, counter, y = self._gctr_ghash_step(carry, counter, y, h)
+            ciphertext_chunks.append(cipher_chunk)
         
         # 合并密文
         ciphertext = b''.join(ciphertext_chunks)
         
-        # 计算GHASH
-        all_blocks = auth_blocks + all_cipher_blocks
-        
-        # 添加长度块
-        len_block = struct.pack('>QQ', len(auth_data) * 8, total_plaintext_len * 8)
-        all_blocks.append(len_block)
-        
-        # 使用优化的GHASH
-        s = self._ultra_fast_ghash(all_blocks, h)
+        # 长度块在流结束时折叠一次
+        len_block = _BE_QQ.pack(len(auth_data) * 8, total_plaintext_len * 8)
+        s = self._ghash_update(y, len_block, h)
         
         # 计算认证标签
-        tag_icb = iv + b'\x00\x00\x00\x01'
-        tag_mask = self._sm4_encrypt_block(tag_icb)
-        tag = bytes(a ^ b for a, b in zip(s, tag_mask))
+        tag_mask = self._tag_mask(iv)
+        tag = _xor_bytes(s, tag_mask)
         
         return ciphertext, tag
-    
-    def _process_chunk(self, chunk: bytes, counter_start: int) -> bytes:
-        """处理单个数据块"""
-        return self._optimized_gctr((counter_start).to_bytes(16, 'big'), chunk)
-
 
 if __name__ == "__main__":
     # 示例使用
@@ -12,13 +12,22 @@ SM4-GCM 工作模式软件优化 - 功能演示程序
 6. 实际应用场景模拟
 """
 
+import json
 import os
 import time
 import random
-from typing import List
+from array import array
+from typing import Dict, List, Optional, Tuple
 from sm4_gcm import SM4_GCM_Base, SM4_GCM_Optimized, SM4_GCM_Advanced
 
 
+def _bit_diff(a: bytes, b: bytes) -> int:
+    """两个等长字节串之间不同的比特数（整数异或后一次统计）"""
+    x = int.from_bytes(a, 'big') ^ int.from_bytes(b, 'big')
+    # int.bit_count需要Python 3.10+
+    return x.bit_count() if hasattr(x, 'bit_count') else bin(x).count('1')
+
+
 class SM4_GCM_Demo:
     """SM4-GCM 功能演示类"""
     
@@ -26,6 +35,17 @@ class SM4_GCM_Demo:
         self.demo_key = b'DemoKey123456789'  # 16字节演示密钥
         self.demo_iv = b'DemoIV123456'      # 12字节演示IV
         
+        # 按(密钥, 优化策略)缓存实例，密钥扩展与H的幂次表每个进程只计算一次
+        self._gcm_cache: Dict[Tuple[bytes, str], SM4_GCM_Optimized] = {}
+    
+    def _gcm(self, key: Optional[bytes] = None, opt: str = 'ttable') -> SM4_GCM_Optimized:
+        """取得(复用)指定密钥与优化策略的SM4_GCM_Optimized实例，密钥默认为演示密钥"""
+        cache_key = (key or self.demo_key, opt)
+        gcm = self._gcm_cache.get(cache_key)
+        if gcm is None:
+            gcm = self._gcm_cache[cache_key] = SM4_GCM_Optimized(*cache_key)
+        return gcm
+        
     def print_header(self, title: str):
         """打印标题"""
         print("\n" + "=" * 80)
@@ -41,7 +61,7 @@ class SM4_GCM_Demo:
         self.print_header("SM4-GCM 基础功能演示")
         
         # 创建 GCM 实例
-        gcm = SM4_GCM_Optimized(self.demo_key, 'ttable')
+        gcm = self._gcm()
         
         # 演示数据
         test_cases = [
@@ -125,20 +145,30 @@ class SM4_GCM_Demo:
             self.print_section(f"{name}测试")
             
             try:
-                gcm = SM4_GCM_Optimized(self.demo_key, opt_type)
+                gcm = self._gcm(opt=opt_type)
                 
-                # 预热
-                gcm.encrypt(self.demo_iv, b'warmup', b'')
+                # 预热：以同样大小的数据走一遍，首次调用的缓存初始化不计入计时
+                gcm.encrypt(self.demo_iv, test_data, auth_data)
                 
-                # 性能测试
-                times = []
-                for _ in range(50):
-                    start_time = time.time()
-                    ciphertext, tag = gcm.encrypt(self.demo_iv, test_data, auth_data)
-                    decrypted = gcm.decrypt(self.demo_iv, ciphertext, tag, auth_data)
-                    times.append(time.time() - start_time)
+                # 循环内只用局部变量，避免每次迭代的属性查找
+                encrypt, decrypt = gcm.encrypt, gcm.decrypt
+                iv, ad = self.demo_iv, auth_data
                 
-                avg_time = sum(times) / len(times)
+                # 性能测试：整批只计时一次，平均时间不含逐次计时的开销
+                iterations = 50
+                start_ns = time.perf_counter_ns()
+                for _ in range(iterations):
+                    ciphertext, tag = encrypt(iv, test_data, ad)
+                    decrypted = decrypt(iv, ciphertext, tag, ad)
+                avg_time = (time.perf_counter_ns() - start_ns) / iterations / 1e9
+                
+                # 单独一轮逐次计时，只用于最快/最慢时间
+                times = array('d', [0.0] * 10)
+                for i in range(len(times)):
+                    start_ns = time.perf_counter_ns()
+                    ciphertext, tag = encrypt(iv, test_data, ad)
+                    decrypted = decrypt(iv, ciphertext, tag, ad)
+                    times[i] = (time.perf_counter_ns() - start_ns) / 1e9
                 throughput = len(test_data) / avg_time / 1024 / 1024  # MB/s
                 
                 results[name] = {
@@ -181,7 +211,7 @@ class SM4_GCM_Demo:
         """演示并行处理能力"""
         self.print_header("SM4-GCM 并行处理能力演示")
         
-        gcm = SM4_GCM_Optimized(self.demo_key, 'ttable')
+        gcm = self._gcm()
         
         # 测试不同大小的数据
         test_sizes = [
@@ -199,14 +229,13 @@ class SM4_GCM_Demo:
             
             print(f"数据大小: {len(test_data)} 字节")
             
-            # 测试多次以获得稳定结果
-            times = []
-            for _ in range(20):
-                start_time = time.time()
-                ciphertext, tag = gcm.encrypt(self.demo_iv, test_data, auth_data)
-                times.append(time.time() - start_time)
-            
-            avg_time = sum(times) / len(times)
+            # 测试多次以获得稳定结果，整批只计时一次
+            encrypt, iv, ad = gcm.encrypt, self.demo_iv, auth_data
+            iterations = 20
+            start_ns = time.perf_counter_ns()
+            for _ in range(iterations):
+                ciphertext, tag = encrypt(iv, test_data, ad)
+            avg_time = (time.perf_counter_ns() - start_ns) / iterations / 1e9
             throughput = len(test_data) / avg_time / 1024 / 1024
             
             print(f"平均处理时间: {avg_time*1000:.2f} ms")
@@ -240,13 +269,8 @@ class SM4_GCM_Demo:
             
             # 生成测试数据
             print("📁 生成测试数据...")
-            test_data = bytearray()
-            chunk_size = 8192  # 8KB chunks
-            
             start_gen = time.time()
-            for i in range(0, size, chunk_size):
-                chunk = os.urandom(min(chunk_size, size - i))
-                test_data.extend(chunk)
+            test_data = os.urandom(size)  # 一次生成，避免逐块调用与拼接
             gen_time = time.time() - start_gen
             
             print(f"数据生成时间: {gen_time*1000:.2f} ms")
@@ -257,9 +281,12 @@ class SM4_GCM_Demo:
             auth_data = f"{size_name} stream test".encode()
             
             # 创建数据块生成器
-            def data_chunks():
-                for i in range(0, len(test_data), chunk_size):
-                    yield test_data[i:i+chunk_size]
+            chunk_size = 8192  # 8KB chunks
+            
+            # memoryview切片共享底层缓冲区，逐块送入时不复制数据
+            def data_chunks(mv=memoryview(test_data), n=chunk_size):
+                for i in range(0, len(mv), n):
+                    yield mv[i:i+n]
             
             start_time = time.time()
             stream_cipher, stream_tag = advanced_gcm.encrypt_stream(
@@ -274,7 +301,7 @@ class SM4_GCM_Demo:
             print("🔄 对比常规加密...")
             start_time = time.time()
             regular_cipher, regular_tag = advanced_gcm.encrypt(
-                self.demo_iv, bytes(test_data), auth_data
+                self.demo_iv, test_data, auth_data
             )
             regular_time = time.time() - start_time
             
@@ -300,7 +327,7 @@ class SM4_GCM_Demo:
         """演示安全特性"""
         self.print_header("SM4-GCM 安全特性演示")
         
-        gcm = SM4_GCM_Optimized(self.demo_key, 'ttable')
+        gcm = self._gcm()
         
         # 1. 完整性保护演示
         self.print_section("1. 数据完整性保护演示")
@@ -315,28 +342,19 @@ class SM4_GCM_Demo:
         ciphertext, tag = gcm.encrypt(self.demo_iv, plaintext, auth_data)
         print(f"认证标签: {tag.hex()}")
         
-        # 测试各种篡改
+        # 测试各种篡改：预先构造好每种篡改后的(密文, 标签, 认证数据)
         tampering_tests = [
-            ("密文首字节篡改", lambda: bytes([ciphertext[0] ^ 1]) + ciphertext[1:]),
-            ("密文末字节篡改", lambda: ciphertext[:-1] + bytes([ciphertext[-1] ^ 1])),
-            ("认证数据篡改", lambda: ciphertext),
-            ("标签篡改", lambda: ciphertext)
+            ("密文首字节篡改", bytes([ciphertext[0] ^ 1]) + ciphertext[1:], tag, auth_data),
+            ("密文末字节篡改", ciphertext[:-1] + bytes([ciphertext[-1] ^ 1]), tag, auth_data),
+            ("认证数据篡改", ciphertext, tag, b"modified auth data"),
+            ("标签篡改", ciphertext, bytes([tag[0] ^ 1]) + tag[1:], auth_data)
         ]
         
-        for test_name, tamper_func in tampering_tests:
+        for test_name, tampered_cipher, tampered_tag, tampered_auth in tampering_tests:
             print(f"\n🔍 {test_name}测试:")
             
             try:
-                if "认证数据" in test_name:
-                    tampered_auth = b"modified auth data"
-                    gcm.decrypt(self.demo_iv, ciphertext, tag, tampered_auth)
-                elif "标签" in test_name:
-                    tampered_tag = bytes([tag[0] ^ 1]) + tag[1:]
-                    gcm.decrypt(self.demo_iv, ciphertext, tampered_tag, auth_data)
-                else:
-                    tampered_cipher = tamper_func()
-                    gcm.decrypt(self.demo_iv, tampered_cipher, tag, auth_data)
-                
+                gcm.decrypt(self.demo_iv, tampered_cipher, tampered_tag, tampered_auth)
                 print("❌ 未检测到篡改（安全问题）")
             except ValueError as e:
                 print(f"✅ 成功检测到篡改: {e}")
@@ -347,18 +365,18 @@ class SM4_GCM_Demo:
         test_message = "密钥敏感性测试消息"
         
         # 原始密钥加密
-        original_gcm = SM4_GCM_Optimized(self.demo_key, 'ttable')
+        original_gcm = self._gcm()
         cipher1, tag1 = original_gcm.encrypt(self.demo_iv, test_message.encode(), b'test')
         
         # 修改一个比特的密钥
         modified_key = bytearray(self.demo_key)
         modified_key[0] ^= 1
-        modified_gcm = SM4_GCM_Optimized(bytes(modified_key), 'ttable')
+        modified_gcm = self._gcm(bytes(modified_key))
         cipher2, tag2 = modified_gcm.encrypt(self.demo_iv, test_message.encode(), b'test')
         
         # 分析差异
-        cipher_diff = sum(bin(a ^ b).count('1') for a, b in zip(cipher1, cipher2))
-        tag_diff = sum(bin(a ^ b).count('1') for a, b in zip(tag1, tag2))
+        cipher_diff = _bit_diff(cipher1, cipher2)
+        tag_diff = _bit_diff(tag1, tag2)
         
         total_cipher_bits = len(cipher1) * 8
         total_tag_bits = len(tag1) * 8
@@ -390,7 +408,7 @@ class SM4_GCM_Demo:
         # 1. 安全文件传输
         self.print_section("1. 安全文件传输模拟")
         
-        gcm = SM4_GCM_Optimized(self.demo_key, 'ttable')
+        gcm = self._gcm()
         
         # 模拟文件内容
         file_content = """
@@ -412,7 +430,9 @@ class SM4_GCM_Demo:
         }
         
         # 创建认证数据
-        auth_data = f"file:{file_metadata['filename']},from:{file_metadata['sender']},to:{file_metadata['receiver']},time:{file_metadata['timestamp']}".encode()
+        auth_data = b'file:%s,from:%s,to:%s,time:%d' % (
+            file_metadata['filename'].encode(), file_metadata['sender'].encode(),
+            file_metadata['receiver'].encode(), file_metadata['timestamp'])
         
         print("📄 模拟文件传输:")
         print(f"文件名: {file_metadata['filename']}")
@@ -451,31 +471,34 @@ class SM4_GCM_Demo:
             {'id': 3, 'name': '王五', 'email': 'wangwu@example.com', 'phone': '13800138003'},
         ]
         
-        encrypted_db = []
+        encrypted_db: Dict[int, dict] = {}  # 按记录id索引
         
         print("🗄️ 模拟数据库加密存储:")
         
+        # 序列化记录与认证数据在计时之前一次完成
+        auth_template = b'record_id:%d,table:users'  # 表名固定，直接按字节模板拼接
+        serialized = [(record['id'],
+                       json.dumps(record, separators=(',', ':'), ensure_ascii=False).encode('utf-8'),
+                       auth_template % record['id'])
+                      for record in database_records]
+        
         total_encrypt_time = 0
-        for record in database_records:
-            # 序列化记录
-            record_data = str(record).encode('utf-8')
-            record_auth = f"record_id:{record['id']},table:users".encode()
-            
+        encrypt, iv = gcm.encrypt, self.demo_iv
+        for record_id, record_data, record_auth in serialized:
             # 加密存储
             start_time = time.time()
-            encrypted_data, tag = gcm.encrypt(self.demo_iv, record_data, record_auth)
+            encrypted_data, tag = encrypt(iv, record_data, record_auth)
             encrypt_time = time.time() - start_time
             total_encrypt_time += encrypt_time
             
-            encrypted_record = {
-                'id': record['id'],
+            encrypted_db[record_id] = {
+                'id': record_id,
                 'encrypted_data': encrypted_data,
                 'auth_tag': tag,
                 'auth_info': record_auth
             }
-            encrypted_db.append(encrypted_record)
             
-            print(f"记录 {record['id']} 加密: {encrypt_time*1000:.2f} ms")
+            print(f"记录 {record_id} 加密: {encrypt_time*1000:.2f} ms")
         
         print(f"总加密时间: {total_encrypt_time*1000:.2f} ms")
         print(f"加密记录数: {len(encrypted_db)}")
@@ -484,12 +507,8 @@ class SM4_GCM_Demo:
         print("\n🔍 模拟数据查询和解密:")
         query_id = 2
         
-        # 查找记录
-        target_record = None
-        for encrypted_record in encrypted_db:
-            if encrypted_record['id'] == query_id:
-                target_record = encrypted_record
-                break
+        # 按id索引查找记录
+        target_record = encrypted_db.get(query_id)
         
         if target_record:
             start_time = time.time()
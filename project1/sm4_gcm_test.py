@@ -201,6 +201,21 @@ class SM4_GCM_Tester:
             # 创建优化的GCM实例
             gcm = SM4_GCM_Optimized(self.test_key, 'ttable')
             
+            # 聚合GHASH必须与逐块GHASH结果一致
+            for num_blocks in [1, 2, 3, 7, 8, 9, 16, 31, 32]:
+                data = os.urandom(16 * num_blocks)
+                blocks = [data[i:i+16] for i in range(0, len(data), 16)]
+                if gcm._parallel_ghash(blocks, gcm.h) != gcm._sequential_ghash(blocks, gcm.h):
+                    print(f"  ✗ 并行GHASH与顺序GHASH不一致（{num_blocks}块）")
+                    return False
+            print("  ✓ 并行GHASH与顺序GHASH一致")
+            
+            # H^0为乘法单位元
+            x = os.urandom(16)
+            if gcm._ghash_optimized_gfmul(x, gcm.h_powers[0]) != x:
+                print("  ✗ H^0不是乘法单位元")
+                return False
+            
             # 测试不同大小的并行处理
             test_sizes = [1024, 4096, 16384]  # 1KB, 4KB, 16KB
             
@@ -266,8 +281,16 @@ class SM4_GCM_Tester:
             )
             stream_time = time.time() - start_time
             
+            # 块长度不是16的倍数时，分组跨越块边界
+            unaligned_ok = True
+            for size in (17, 1000):
+                parts = [large_data[i:i+size] for i in range(0, len(large_data), size)]
+                if advanced_gcm.encrypt_stream(self.test_iv, parts, auth_data, size) != (regular_cipher, regular_tag):
+                    print(f"  ✗ 块长度{size}字节时流式处理结果不匹配")
+                    unaligned_ok = False
+            
             # 验证结果一致性
-            if stream_cipher == regular_cipher and stream_tag == regular_tag:
+            if stream_cipher == regular_cipher and stream_tag == regular_tag and unaligned_ok:
                 print(f"  ✓ 流式处理结果正确")
                 print(f"  ✓ 常规加密时间: {regular_time*1000:.2f} ms")
                 print(f"  ✓ 流式加密时间: {stream_time*1000:.2f} ms")
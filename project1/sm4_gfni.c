@@ -0,0 +1,253 @@
+/*
+ * SM4 GFNI + AVX-512 Implementation
+ * 基于 GFNI 仿射指令的 SM4 S 盒 16 分组并行实现
+ *
+ * SM4 S 盒结构为 S(x) = A·I(A·x + c) + c，其中 I 为 GF(2^8) 求逆。
+ * 将 SM4 域 (x^8+x^7+x^6+x^5+x^4+x^2+1) 经同构映射 φ 变换到 AES 域后：
+ *   S(x) = (A·φ⁻¹)·I_AES((φ·A)·x + φ·c) + c
+ * 第一步用 GF2P8AFFINEQB 完成 (φ·A, φ·c)，第二步用 GF2P8AFFINEINVQB
+ * 完成 AES 域求逆及 (A·φ⁻¹, c)，每条指令一次处理 64 个字节。
+ *
+ * 状态按列存放：4 个 zmm 寄存器分别保存 16 个分组的 X0..X3，
+ * 线性变换 L 的循环移位使用 VPROLD。无 AVX-512 时退化为 AVX2 + GFNI
+ * 的 8 分组路径，仅有 128 位 GFNI 时使用 SSE 的 4 分组路径；
+ * 每个 S 盒仍只需两条仿射指令，不需要 AES-NI 的 PSHUFB 查表与零轮密钥。
+ */
+
+#include "sm4_common.h"
+
+#ifdef __x86_64__
+#include <immintrin.h> // Intel intrinsics
+#endif
+
+// GFNI 仿射矩阵与常数（由 SM4 S 盒推导，已与参考实现逐项校验）
+#define SM4_AFFINE1 0x4c287db91a22505dULL // φ·A
+#define SM4_AFFINE1_C 0x3e                // φ·c
+#define SM4_AFFINE2 0xf3ab34a974a6b589ULL // A·φ⁻¹
+#define SM4_AFFINE2_C 0xd3                // c
+
+#ifdef __x86_64__
+
+#define SM4_AVX512_TARGET __attribute__((target("avx512f,avx512bw,gfni")))
+#define SM4_AVX2_TARGET __attribute__((target("avx2,gfni")))
+#define SM4_SSE_TARGET __attribute__((target("ssse3,gfni")))
+
+/*
+ * 循环左移
+ * AVX-512F 提供原生 VPROLD；AVX2 无 32 位循环移位指令，使用移位+或模拟
+ * （256 位的 VPROLD 需要 AVX512VL，不能假定仅有 AVX2 的处理器支持）
+ */
+#define ROL512(x, n) _mm512_rol_epi32((x), (n))
+#define ROL256(x, n) _mm256_or_si256(_mm256_slli_epi32((x), (n)), _mm256_srli_epi32((x), 32 - (n)))
+#define ROL128(x, n) _mm_or_si128(_mm_slli_epi32((x), (n)), _mm_srli_epi32((x), 32 - (n)))
+
+/*
+ * 对 16 个字并行执行线性变换 L(B) = B ^ (B <<< 2) ^ (B <<< 10) ^ (B <<< 18) ^ (B <<< 24)
+ * 4 条 VPROLD 加 2 条三输入异或（VPTERNLOGD 0x96）
+ */
+SM4_AVX512_TARGET static inline __m512i sm4_l_x16(__m512i b)
+{
+    return _mm512_ternarylogic_epi32(
+        _mm512_ternarylogic_epi32(b, ROL512(b, 2), ROL512(b, 10), 0x96),
+        ROL512(b, 18), ROL512(b, 24), 0x96);
+}
+
+// 对 16 个字并行执行合成置换 T
+SM4_AVX512_TARGET static inline __m512i sm4_t_x16(__m512i x)
+{
+    const __m512i a1 = _mm512_set1_epi64((long long)SM4_AFFINE1);
+    const __m512i a2 = _mm512_set1_epi64((long long)SM4_AFFINE2);
+
+    x = _mm512_gf2p8affine_epi64_epi8(x, a1, SM4_AFFINE1_C);
+    x = _mm512_gf2p8affineinv_epi64_epi8(x, a2, SM4_AFFINE2_C);
+
+    return sm4_l_x16(x);
+}
+
+// 处理 16 个连续分组（256 字节）
+SM4_AVX512_TARGET static void sm4_crypt_x16(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    // 每个分组内的大端字节序转换
+    const __m512i bswap = _mm512_broadcast_i32x4(
+        _mm_set_epi8(12, 13, 14, 15, 8, 9, 10, 11, 4, 5, 6, 7, 0, 1, 2, 3));
+
+    // 每个寄存器载入 4 个连续分组，通道内转置为按列存放
+    __m512i x0 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)in), bswap);
+    __m512i x1 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 64)), bswap);
+    __m512i x2 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 128)), bswap);
+    __m512i x3 = _mm512_shuffle_epi8(_mm512_loadu_si512((const void *)(in + 192)), bswap);
+    TRANSPOSE4_512(x0, x1, x2, x3);
+
+    // 每次迭代展开4轮，轮换通过变量重命名完成
+    for (int i = 0; i < 32; i += 4)
+    {
+        x0 = _mm512_xor_si512(x0, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x1, x2, _mm512_xor_si512(x3, _mm512_set1_epi32((int)rk[i])), 0x96)));
+        x1 = _mm512_xor_si512(x1, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x2, x3, _mm512_xor_si512(x0, _mm512_set1_epi32((int)rk[i + 1])), 0x96)));
+        x2 = _mm512_xor_si512(x2, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x3, x0, _mm512_xor_si512(x1, _mm512_set1_epi32((int)rk[i + 2])), 0x96)));
+        x3 = _mm512_xor_si512(x3, sm4_t_x16(_mm512_ternarylogic_epi32(
+                                      x0, x1, _mm512_xor_si512(x2, _mm512_set1_epi32((int)rk[i + 3])), 0x96)));
+    }
+
+    // 反序变换后转置回分组顺序写回
+    TRANSPOSE4_512(x3, x2, x1, x0);
+    _mm512_storeu_si512((void *)out, _mm512_shuffle_epi8(x3, bswap));
+    _mm512_storeu_si512((void *)(out + 64), _mm512_shuffle_epi8(x2, bswap));
+    _mm512_storeu_si512((void *)(out + 128), _mm512_shuffle_epi8(x1, bswap));
+    _mm512_storeu_si512((void *)(out + 192), _mm512_shuffle_epi8(x0, bswap));
+}
+
+// 对 8 个字并行执行合成置换 T（AVX2 + GFNI）
+SM4_AVX2_TARGET static inline __m256i sm4_t_x8(__m256i x)
+{
+    const __m256i a1 = _mm256_set1_epi64x((long long)SM4_AFFINE1);
+    const __m256i a2 = _mm256_set1_epi64x((long long)SM4_AFFINE2);
+
+    x = _mm256_gf2p8affine_epi64_epi8(x, a1, SM4_AFFINE1_C);
+    x = _mm256_gf2p8affineinv_epi64_epi8(x, a2, SM4_AFFINE2_C);
+
+    return _mm256_xor_si256(
+        _mm256_xor_si256(x, ROL256(x, 2)),
+        _mm256_xor_si256(ROL256(x, 10), _mm256_xor_si256(ROL256(x, 18), ROL256(x, 24))));
+}
+
+// 处理 8 个连续分组（128 字节）
+SM4_AVX2_TARGET static void sm4_crypt_x8(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    const __m256i bswap = _mm256_set_epi8(
+        12, 13, 14, 15, 8, 9, 10, 11, 4, 5, 6, 7, 0, 1, 2, 3,
+        12, 13, 14, 15, 8, 9, 10, 11, 4, 5, 6, 7, 0, 1, 2, 3);
+
+    // 每个寄存器载入 2 个连续分组，通道内转置为按列存放
+    __m256i x[4];
+    for (int j = 0; j < 4; j++)
+        x[j] = _mm256_shuffle_epi8(_mm256_loadu_si256((const __m256i *)(in + 32 * j)), bswap);
+    TRANSPOSE4_256(x[0], x[1], x[2], x[3]);
+
+    for (int i = 0; i < 32; i += 4)
+    {
+        x[0] = _mm256_xor_si256(x[0], sm4_t_x8(_mm256_xor_si256(
+                                          _mm256_xor_si256(x[1], x[2]), _mm256_xor_si256(x[3], _mm256_set1_epi32((int)rk[i])))));
+        x[1] = _mm256_xor_si256(x[1], sm4_t_x8(_mm256_xor_si256(
+                                          _mm256_xor_si256(x[2], x[3]), _mm256_xor_si256(x[0], _mm256_set1_epi32((int)rk[i + 1])))));
+        x[2] = _mm256_xor_si256(x[2], sm4_t_x8(_mm256_xor_si256(
+                                          _mm256_xor_si256(x[3], x[0]), _mm256_xor_si256(x[1], _mm256_set1_epi32((int)rk[i + 2])))));
+        x[3] = _mm256_xor_si256(x[3], sm4_t_x8(_mm256_xor_si256(
+                                          _mm256_xor_si256(x[0], x[1]), _mm256_xor_si256(x[2], _mm256_set1_epi32((int)rk[i + 3])))));
+    }
+
+    // 反序变换后转置回分组顺序写回
+    TRANSPOSE4_256(x[3], x[2], x[1], x[0]);
+    for (int j = 0; j < 4; j++)
+        _mm256_storeu_si256((__m256i *)(out + 32 * j), _mm256_shuffle_epi8(x[3 - j], bswap));
+}
+
+// 对 4 个字并行执行合成置换 T（SSE + GFNI）
+SM4_SSE_TARGET static inline __m128i sm4_t_x4(__m128i x)
+{
+    const __m128i a1 = _mm_set1_epi64x((long long)SM4_AFFINE1);
+    const __m128i a2 = _mm_set1_epi64x((long long)SM4_AFFINE2);
+
+    x = _mm_gf2p8affine_epi64_epi8(x, a1, SM4_AFFINE1_C);
+    x = _mm_gf2p8affineinv_epi64_epi8(x, a2, SM4_AFFINE2_C);
+
+    return _mm_xor_si128(_mm_xor_si128(x, ROL128(x, 2)),
+                         _mm_xor_si128(ROL128(x, 10), _mm_xor_si128(ROL128(x, 18), ROL128(x, 24))));
+}
+
+// 处理 4 个连续分组（64 字节），用于仅支持 128 位 GFNI 的处理器
+SM4_SSE_TARGET static void sm4_crypt_x4(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    const __m128i bswap = _mm_setr_epi8(3, 2, 1, 0, 7, 6, 5, 4, 11, 10, 9, 8, 15, 14, 13, 12);
+
+    __m128i x0 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)in), bswap);
+    __m128i x1 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 16)), bswap);
+    __m128i x2 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 32)), bswap);
+    __m128i x3 = _mm_shuffle_epi8(_mm_loadu_si128((const __m128i *)(in + 48)), bswap);
+    TRANSPOSE4(x0, x1, x2, x3);
+
+    for (int i = 0; i < 32; i += 4)
+    {
+        x0 = _mm_xor_si128(x0, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x1, x2),
+                                                      _mm_xor_si128(x3, _mm_set1_epi32((int)rk[i])))));
+        x1 = _mm_xor_si128(x1, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x2, x3),
+                                                      _mm_xor_si128(x0, _mm_set1_epi32((int)rk[i + 1])))));
+        x2 = _mm_xor_si128(x2, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x3, x0),
+                                                      _mm_xor_si128(x1, _mm_set1_epi32((int)rk[i + 2])))));
+        x3 = _mm_xor_si128(x3, sm4_t_x4(_mm_xor_si128(_mm_xor_si128(x0, x1),
+                                                      _mm_xor_si128(x2, _mm_set1_epi32((int)rk[i + 3])))));
+    }
+
+    TRANSPOSE4(x3, x2, x1, x0);
+    _mm_storeu_si128((__m128i *)out, _mm_shuffle_epi8(x3, bswap));
+    _mm_storeu_si128((__m128i *)(out + 16), _mm_shuffle_epi8(x2, bswap));
+    _mm_storeu_si128((__m128i *)(out + 32), _mm_shuffle_epi8(x1, bswap));
+    _mm_storeu_si128((__m128i *)(out + 48), _mm_shuffle_epi8(x0, bswap));
+}
+
+static int sm4_has_avx512(void)
+{
+    __builtin_cpu_init();
+    return __builtin_cpu_supports("avx512f") && __builtin_cpu_supports("avx512bw");
+}
+
+static void sm4_gfni_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    if (sm4_has_avx512())
+        sm4_ecb_run(sm4_crypt_x16, 16, rk, in, out, nblocks);
+    else if (__builtin_cpu_supports("avx2"))
+        sm4_ecb_run(sm4_crypt_x8, 8, rk, in, out, nblocks);
+    else
+        sm4_ecb_run(sm4_crypt_x4, 4, rk, in, out, nblocks);
+}
+
+int sm4_gfni_available(void)
+{
+    __builtin_cpu_init();
+    return __builtin_cpu_supports("gfni") && __builtin_cpu_supports("ssse3");
+}
+
+#else
+
+int sm4_gfni_available(void)
+{
+    return 0;
+}
+
+static void sm4_gfni_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    (void)rk;
+    (void)in;
+    (void)out;
+    (void)nblocks;
+}
+
+#endif
+
+/*
+ * ECB 加密 nblocks 个 16 字节分组
+ * 调用前须确认 sm4_gfni_available() 返回非零
+ */
+void sm4_gfni_ecb_encrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32];
+    sm4_expand_key(key, rk);
+    sm4_gfni_ecb(rk, in, out, nblocks);
+}
+
+// ECB 解密：轮密钥逆序使用
+void sm4_gfni_ecb_decrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32], rrk[32];
+    sm4_expand_key(key, rk);
+    sm4_reverse_keys(rk, rrk);
+    sm4_gfni_ecb(rrk, in, out, nblocks);
+}
+
+// 使用调用方预先扩展的轮密钥处理 nblocks 个分组（传入逆序轮密钥即为解密）
+void sm4_gfni_ecb_crypt(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    sm4_gfni_ecb(rk, in, out, nblocks);
+}
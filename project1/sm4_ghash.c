@@ -0,0 +1,176 @@
+/*
+ * SM4-GCM GHASH PCLMULQDQ Implementation
+ * 基于无进位乘法指令的 GF(2^128) 乘法
+ *
+ * 与 sm4_gcm.py 中 _ghash_optimized_gfmul 逐位一致：
+ *   X = x 按大端解析的 128 位整数，Y = y 按小端解析的 128 位整数，
+ *   结果 = X·Y mod (x^128 + x^7 + x^2 + x + 1)，按大端输出。
+ * 乘积由 4 条 PCLMULQDQ 得到 256 位结果，高 128 位 H 满足
+ * H·x^128 ≡ H·0x87，再用 3 条 PCLMULQDQ 折叠回低 128 位。
+ * 批量接口在一次调用内完成整个 GHASH 链，省去逐块的 ctypes 调用开销；
+ * 每 8 个分组按 y' = (y^M0)·h^8 ^ M1·h^7 ^ ... ^ M7·h 聚合，各分组用
+ * Karatsuba 3 条 PCLMULQDQ 求未约简乘积并累加，每批只约简一次。
+ */
+
+#include <stdint.h>
+#include <stddef.h>
+
+#ifdef __x86_64__
+
+#include <immintrin.h> // Intel intrinsics
+
+#define SM4_CLMUL_TARGET __attribute__((target("pclmul,ssse3")))
+
+// 字节逆序：大端字节串 <-> 小端 128 位整数
+SM4_CLMUL_TARGET static inline __m128i bswap128(__m128i v)
+{
+    return _mm_shuffle_epi8(v, _mm_set_epi8(0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15));
+}
+
+// 256 位乘积 hi·x^128 + lo 约简到 128 位
+SM4_CLMUL_TARGET static inline __m128i reduce(__m128i lo, __m128i hi)
+{
+    const __m128i poly = _mm_set_epi64x(0, 0x87);
+
+    // H·0x87：低 64 位部分不超过 71 位，高 64 位部分溢出的 7 位再折叠一次
+    __m128i t0 = _mm_clmulepi64_si128(hi, poly, 0x00);
+    __m128i t1 = _mm_clmulepi64_si128(hi, poly, 0x01);
+    __m128i t2 = _mm_clmulepi64_si128(_mm_srli_si128(t1, 8), poly, 0x00);
+    lo = _mm_xor_si128(lo, t0);
+    lo = _mm_xor_si128(lo, _mm_slli_si128(t1, 8));
+    return _mm_xor_si128(lo, t2);
+}
+
+// a·b mod (x^128 + x^7 + x^2 + x + 1)，a、b 均为小端 128 位整数
+SM4_CLMUL_TARGET static inline __m128i gfmul(__m128i a, __m128i b)
+{
+    __m128i lo = _mm_clmulepi64_si128(a, b, 0x00);
+    __m128i hi = _mm_clmulepi64_si128(a, b, 0x11);
+    __m128i mid = _mm_xor_si128(_mm_clmulepi64_si128(a, b, 0x01), _mm_clmulepi64_si128(a, b, 0x10));
+    lo = _mm_xor_si128(lo, _mm_slli_si128(mid, 8));
+    hi = _mm_xor_si128(hi, _mm_srli_si128(mid, 8));
+    return reduce(lo, hi);
+}
+
+// 高低 64 位异或，Karatsuba 中间项的乘数
+SM4_CLMUL_TARGET static inline __m128i fold64(__m128i v)
+{
+    return _mm_xor_si128(v, _mm_srli_si128(v, 8));
+}
+
+SM4_CLMUL_TARGET static void ghash_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    __m128i a = bswap128(_mm_loadu_si128((const __m128i *)x));
+    __m128i b = _mm_loadu_si128((const __m128i *)y);
+    _mm_storeu_si128((__m128i *)out, bswap128(gfmul(a, b)));
+}
+
+// 平方：交叉项 a0·a1 在 GF(2) 上成对抵消，只需 2 次乘法
+SM4_CLMUL_TARGET static void ghash_square(const uint8_t *x, uint8_t *out)
+{
+    __m128i a = _mm_loadu_si128((const __m128i *)x);
+    __m128i lo = _mm_clmulepi64_si128(a, a, 0x00);
+    __m128i hi = _mm_clmulepi64_si128(a, a, 0x11);
+    _mm_storeu_si128((__m128i *)out, reduce(lo, hi));
+}
+
+SM4_CLMUL_TARGET static void ghash_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    __m128i hv = _mm_loadu_si128((const __m128i *)h);
+    __m128i acc = bswap128(_mm_loadu_si128((const __m128i *)y));
+    size_t i = 0;
+
+    if (nblocks >= 8)
+    {
+        // hp[j] = h^(8-j)，hk[j] 为其高低半异或
+        __m128i hp[8], hk[8];
+        hp[7] = hv;
+        for (int j = 6; j >= 0; j--)
+            hp[j] = gfmul(hp[j + 1], hv);
+        for (int j = 0; j < 8; j++)
+            hk[j] = fold64(hp[j]);
+
+        for (; i + 8 <= nblocks; i += 8)
+        {
+            __m128i lo = _mm_setzero_si128(), hi = _mm_setzero_si128(), mid = _mm_setzero_si128();
+            for (int j = 0; j < 8; j++)
+            {
+                __m128i m = bswap128(_mm_loadu_si128((const __m128i *)(data + 16 * (i + j))));
+                if (j == 0)
+                    m = _mm_xor_si128(m, acc);
+                lo = _mm_xor_si128(lo, _mm_clmulepi64_si128(m, hp[j], 0x00));
+                hi = _mm_xor_si128(hi, _mm_clmulepi64_si128(m, hp[j], 0x11));
+                mid = _mm_xor_si128(mid, _mm_clmulepi64_si128(fold64(m), hk[j], 0x00));
+            }
+            // Karatsuba：中间项 = (a0^a1)(b0^b1) ^ a0b0 ^ a1b1
+            mid = _mm_xor_si128(mid, _mm_xor_si128(lo, hi));
+            lo = _mm_xor_si128(lo, _mm_slli_si128(mid, 8));
+            hi = _mm_xor_si128(hi, _mm_srli_si128(mid, 8));
+            acc = reduce(lo, hi);
+        }
+    }
+
+    for (; i < nblocks; i++)
+    {
+        __m128i blk = bswap128(_mm_loadu_si128((const __m128i *)(data + 16 * i)));
+        acc = gfmul(_mm_xor_si128(acc, blk), hv);
+    }
+    _mm_storeu_si128((__m128i *)y, bswap128(acc));
+}
+
+int sm4_ghash_available(void)
+{
+    __builtin_cpu_init();
+    return __builtin_cpu_supports("pclmul") && __builtin_cpu_supports("ssse3");
+}
+
+#else
+
+int sm4_ghash_available(void)
+{
+    return 0;
+}
+
+static void ghash_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    (void)x;
+    (void)y;
+    (void)out;
+}
+
+static void ghash_square(const uint8_t *x, uint8_t *out)
+{
+    (void)x;
+    (void)out;
+}
+
+static void ghash_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    (void)h;
+    (void)y;
+    (void)data;
+    (void)nblocks;
+}
+
+#endif
+
+/*
+ * out = x · y，语义同 _ghash_optimized_gfmul(x, y)
+ * 调用前须确认 sm4_ghash_available() 返回非零
+ */
+void sm4_ghash_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    ghash_gfmul(x, y, out);
+}
+
+// out = x²，x、out 均为小端 128 位整数（即 H 的幂次的存放格式）
+void sm4_ghash_square(const uint8_t *x, uint8_t *out)
+{
+    ghash_square(x, out);
+}
+
+// 对 nblocks 个分组依次执行 y = (y ^ block) · h，y 原地更新
+void sm4_ghash_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    ghash_blocks(h, y, data, nblocks);
+}
@@ -0,0 +1,60 @@
+# SM4-GCM GHASH 的 Numba JIT 内核
+
+"""
+本地无进位乘法内核不可用时GHASH乘法的编译后备
+
+128位操作数拆为(高64位, 低64位)两个uint64，乘法按位Horner展开，
+条件异或用全0/全1掩码代替分支，约简在每次左移时以0x87折叠。
+语义与sm4_gcm中的_ghash_gfmul一致：x·y mod (x^128 + x^7 + x^2 + x + 1)。
+"""
+
+from numba import njit, uint64
+from numba.types import UniTuple
+
+
+@njit(UniTuple(uint64, 2)(uint64, uint64, uint64, uint64), cache=True, nogil=True)
+def _gfmul_u64x2(xh, xl, yh, yl):
+    """
+    GF(2^128)乘法
+
+    Args:
+        xh, xl: 第一个操作数的高/低64位
+        yh, yl: 第二个操作数的高/低64位
+
+    Returns:
+        乘积的(高64位, 低64位)
+    """
+    one = uint64(1)
+    top = uint64(63)
+    poly = uint64(0x87)
+    zero = uint64(0)
+    zh = zero
+    zl = zero
+    for w in (yh, yl):
+        for i in range(63, -1, -1):
+            # z = z·x mod p：移出的最高位以掩码折叠0x87
+            carry = zh >> top
+            zh = (zh << one) | (zl >> top)
+            zl = (zl << one) ^ (poly & (zero - carry))
+            mask = zero - ((w >> uint64(i)) & one)
+            zh ^= xh & mask
+            zl ^= xl & mask
+    return zh, zl
+
+
+@njit(UniTuple(uint64, 2)(uint64[::1], uint64, uint64, uint64, uint64), cache=True, nogil=True)
+def _ghash_blocks(words, yh, yl, hh, hl):
+    """
+    对words中的分组依次计算 y = (y ^ block) · h
+
+    Args:
+        words: uint64数组，每个分组为(高64位, 低64位)两项
+        yh, yl: 初始值
+        hh, hl: 乘数
+
+    Returns:
+        结果的(高64位, 低64位)
+    """
+    for k in range(0, words.size, 2):
+        yh, yl = _gfmul_u64x2(yh ^ words[k], yl ^ words[k + 1], hh, hl)
+    return yh, yl
@@ -0,0 +1,199 @@
+/*
+ * SM4-GCM GHASH ARMv8 PMULL Implementation
+ * 基于 PMULL 多项式乘法指令的 GF(2^128) 乘法
+ *
+ * 语义与 sm4_ghash.c 的 PCLMULQDQ 内核逐位一致：
+ *   X = x 按大端解析的 128 位整数，Y = y 按小端解析的 128 位整数，
+ *   结果 = X·Y mod (x^128 + x^7 + x^2 + x + 1)，按大端输出。
+ * 64×64 位乘积由 vmull_p64 / vmull_high_p64 得到，约简同样以 0x87 两次折叠；
+ * 批量接口每 8 个分组聚合一次，Karatsuba 累加未约简乘积，每批只约简一次。
+ * 需以 -march=armv8-a+crypto 编译，运行时通过 HWCAP_PMULL 确认处理器支持。
+ */
+
+#include <stdint.h>
+#include <stddef.h>
+
+#if defined(__aarch64__) && (defined(__ARM_FEATURE_AES) || defined(__ARM_FEATURE_CRYPTO))
+#include <arm_neon.h> // ARM NEON intrinsics
+#include <sys/auxv.h>
+
+#ifndef HWCAP_PMULL
+#define HWCAP_PMULL (1 << 4)
+#endif
+
+// 字节逆序：大端字节串 <-> 小端 128 位整数
+static inline uint8x16_t bswap128(uint8x16_t v)
+{
+    v = vrev64q_u8(v);
+    return vextq_u8(v, v, 8);
+}
+
+// 低 64 位之积
+static inline uint8x16_t pmull_lo(uint8x16_t a, uint8x16_t b)
+{
+    return vreinterpretq_u8_p128(vmull_p64(vgetq_lane_p64(vreinterpretq_p64_u8(a), 0),
+                                           vgetq_lane_p64(vreinterpretq_p64_u8(b), 0)));
+}
+
+// 高 64 位之积
+static inline uint8x16_t pmull_hi(uint8x16_t a, uint8x16_t b)
+{
+    return vreinterpretq_u8_p128(vmull_high_p64(vreinterpretq_p64_u8(a), vreinterpretq_p64_u8(b)));
+}
+
+// 左移 / 右移 64 位
+static inline uint8x16_t shl64(uint8x16_t v)
+{
+    return vextq_u8(vdupq_n_u8(0), v, 8);
+}
+
+static inline uint8x16_t shr64(uint8x16_t v)
+{
+    return vextq_u8(v, vdupq_n_u8(0), 8);
+}
+
+// 256 位乘积 hi·x^128 + lo 约简到 128 位
+static inline uint8x16_t reduce(uint8x16_t lo, uint8x16_t hi)
+{
+    const uint8x16_t poly = vreinterpretq_u8_u64(vdupq_n_u64(0x87));
+
+    // H·0x87：低 64 位部分不超过 71 位，高 64 位部分溢出的 7 位再折叠一次
+    uint8x16_t t0 = pmull_lo(hi, poly);
+    uint8x16_t t1 = pmull_hi(hi, poly);
+    uint8x16_t t2 = pmull_lo(shr64(t1), poly);
+    lo = veorq_u8(lo, t0);
+    lo = veorq_u8(lo, shl64(t1));
+    return veorq_u8(lo, t2);
+}
+
+// a·b mod (x^128 + x^7 + x^2 + x + 1)，a、b 均为小端 128 位整数
+static inline uint8x16_t gfmul(uint8x16_t a, uint8x16_t b)
+{
+    uint8x16_t bs = vextq_u8(b, b, 8);
+    uint8x16_t lo = pmull_lo(a, b);
+    uint8x16_t hi = pmull_hi(a, b);
+    uint8x16_t mid = veorq_u8(pmull_lo(a, bs), pmull_hi(a, bs));
+    lo = veorq_u8(lo, shl64(mid));
+    hi = veorq_u8(hi, shr64(mid));
+    return reduce(lo, hi);
+}
+
+// 高低 64 位异或，Karatsuba 中间项的乘数
+static inline uint8x16_t fold64(uint8x16_t v)
+{
+    return veorq_u8(v, shr64(v));
+}
+
+static void ghash_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    uint8x16_t a = bswap128(vld1q_u8(x));
+    uint8x16_t b = vld1q_u8(y);
+    vst1q_u8(out, bswap128(gfmul(a, b)));
+}
+
+// 平方：交叉项 a0·a1 在 GF(2) 上成对抵消，只需 2 次乘法
+static void ghash_square(const uint8_t *x, uint8_t *out)
+{
+    uint8x16_t a = vld1q_u8(x);
+    vst1q_u8(out, reduce(pmull_lo(a, a), pmull_hi(a, a)));
+}
+
+static void ghash_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    uint8x16_t hv = vld1q_u8(h);
+    uint8x16_t acc = bswap128(vld1q_u8(y));
+    size_t i = 0;
+
+    if (nblocks >= 8)
+    {
+        // hp[j] = h^(8-j)，hk[j] 为其高低半异或
+        uint8x16_t hp[8], hk[8];
+        hp[7] = hv;
+        for (int j = 6; j >= 0; j--)
+            hp[j] = gfmul(hp[j + 1], hv);
+        for (int j = 0; j < 8; j++)
+            hk[j] = fold64(hp[j]);
+
+        for (; i + 8 <= nblocks; i += 8)
+        {
+            uint8x16_t lo = vdupq_n_u8(0), hi = vdupq_n_u8(0), mid = vdupq_n_u8(0);
+            for (int j = 0; j < 8; j++)
+            {
+                uint8x16_t m = bswap128(vld1q_u8(data + 16 * (i + j)));
+                if (j == 0)
+                    m = veorq_u8(m, acc);
+                lo = veorq_u8(lo, pmull_lo(m, hp[j]));
+                hi = veorq_u8(hi, pmull_hi(m, hp[j]));
+                mid = veorq_u8(mid, pmull_lo(fold64(m), hk[j]));
+            }
+            // Karatsuba：中间项 = (a0^a1)(b0^b1) ^ a0b0 ^ a1b1
+            mid = veorq_u8(mid, veorq_u8(lo, hi));
+            lo = veorq_u8(lo, shl64(mid));
+            hi = veorq_u8(hi, shr64(mid));
+            acc = reduce(lo, hi);
+        }
+    }
+
+    for (; i < nblocks; i++)
+    {
+        uint8x16_t blk = bswap128(vld1q_u8(data + 16 * i));
+        acc = gfmul(veorq_u8(acc, blk), hv);
+    }
+    vst1q_u8(y, bswap128(acc));
+}
+
+int sm4_ghash_pmull_available(void)
+{
+    return (getauxval(AT_HWCAP) & HWCAP_PMULL) != 0;
+}
+
+#else
+
+int sm4_ghash_pmull_available(void)
+{
+    return 0;
+}
+
+static void ghash_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    (void)x;
+    (void)y;
+    (void)out;
+}
+
+static void ghash_square(const uint8_t *x, uint8_t *out)
+{
+    (void)x;
+    (void)out;
+}
+
+static void ghash_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    (void)h;
+    (void)y;
+    (void)data;
+    (void)nblocks;
+}
+
+#endif
+
+/*
+ * out = x · y，语义同 _ghash_optimized_gfmul(x, y)
+ * 调用前须确认 sm4_ghash_pmull_available() 返回非零
+ */
+void sm4_ghash_pmull_gfmul(const uint8_t *x, const uint8_t *y, uint8_t *out)
+{
+    ghash_gfmul(x, y, out);
+}
+
+// out = x²，x、out 均为小端 128 位整数（即 H 的幂次的存放格式）
+void sm4_ghash_pmull_square(const uint8_t *x, uint8_t *out)
+{
+    ghash_square(x, out);
+}
+
+// 对 nblocks 个分组依次执行 y = (y ^ block) · h，y 原地更新
+void sm4_ghash_pmull_blocks(const uint8_t *h, uint8_t *y, const uint8_t *data, size_t nblocks)
+{
+    ghash_blocks(h, y, data, nblocks);
+}
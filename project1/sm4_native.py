@@ -0,0 +1,274 @@
+# SM4 本地内核加载器
+
+"""
+通过ctypes加载由Makefile构建的本地共享库
+
+共享库不存在、加载失败或CPU不支持对应指令集时，相应接口的
+*_available()返回False，调用方回退到纯Python实现。
+"""
+
+import ctypes
+import os
+
+_LIB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load(name):
+    """加载共享库，失败时返回None"""
+    try:
+        return ctypes.CDLL(os.path.join(_LIB_DIR, name))
+    except OSError:
+        return None
+
+
+def _load_ecb(name, prefix):
+    """加载提供 <prefix>_ecb_encrypt/decrypt/available 接口的ECB内核"""
+    lib = _load(name)
+    if lib is None:
+        return None
+    for fn in (getattr(lib, prefix + '_ecb_encrypt'), getattr(lib, prefix + '_ecb_decrypt')):
+        fn.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
+        fn.restype = None
+    # 可选：使用预先扩展轮密钥的接口
+    crypt = getattr(lib, prefix + '_ecb_crypt', None)
+    if crypt is not None:
+        crypt.argtypes = [ctypes.POINTER(ctypes.c_uint32), ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t]
+        crypt.restype = None
+    available = getattr(lib, prefix + '_available')
+    available.restype = ctypes.c_int
+    return lib if available() else None
+
+
+def _ecb(fn, key, data):
+    """调用ECB内核处理长度为16倍数的数据"""
+    out = ctypes.create_string_buffer(len(data))
+    fn(bytes(key), bytes(data), out, len(data) // 16)
+    return out.raw
+
+
+def _ecb_rk(fn, round_keys, data):
+    """使用预先打包的轮密钥调用ECB内核"""
+    out = ctypes.create_string_buffer(len(data))
+    fn(round_keys, bytes(data), out, len(data) // 16)
+    return out.raw
+
+
+# GFNI + AVX-512 SM4 ECB内核
+_gfni = _load_ecb('libsm4_gfni.so', 'sm4_gfni')
+
+# AES-NI SM4 ECB内核
+_aesni = _load_ecb('libsm4_aesni.so', 'sm4_aesni')
+
+# ARMv8 SM4E/SM4EKEY ECB内核
+_neon = _load_ecb('libsm4_neon.so', 'sm4_neon')
+
+# ARM NEON TBL查表ECB内核（无SM4指令的ARMv8）
+_neon_tbl = _load_ecb('libsm4_neon_tbl.so', 'sm4_neon_tbl')
+
+# 通用T表ECB内核（不依赖指令集扩展）
+_ttable = _load_ecb('libsm4_ttable.so', 'sm4_ttable')
+
+
+def gfni_available():
+    """GFNI内核是否可用"""
+    return _gfni is not None
+
+
+def gfni_ecb_encrypt(key, data):
+    """
+    使用GFNI内核ECB加密
+
+    Args:
+        key: 16字节密钥
+        data: 长度为16倍数的数据
+
+    Returns:
+        加密后的数据
+    """
+    return _ecb(_gfni.sm4_gfni_ecb_encrypt, key, data)
+
+
+def gfni_ecb_decrypt(key, data):
+    """使用GFNI内核ECB解密"""
+    return _ecb(_gfni.sm4_gfni_ecb_decrypt, key, data)
+
+
+def gfni_ecb_crypt(round_keys, data):
+    """使用预先扩展的轮密钥调用GFNI内核（参数同aesni_ecb_crypt）"""
+    return _ecb_rk(_gfni.sm4_gfni_ecb_crypt, round_keys, data)
+
+
+def aesni_available():
+    """AES-NI内核是否可用"""
+    return _aesni is not None
+
+
+def aesni_ecb_encrypt(key, data):
+    """使用AES-NI内核ECB加密"""
+    return _ecb(_aesni.sm4_aesni_ecb_encrypt, key, data)
+
+
+def aesni_ecb_decrypt(key, data):
+    """使用AES-NI内核ECB解密"""
+    return _ecb(_aesni.sm4_aesni_ecb_decrypt, key, data)
+
+
+def pack_round_keys(round_keys):
+    """将32个轮密钥打包为C数组，同一组轮密钥可在多次调用间复用"""
+    return (ctypes.c_uint32 * 32)(*round_keys)
+
+
+def aesni_ecb_crypt(round_keys, data):
+    """
+    使用预先扩展的轮密钥调用AES-NI内核，省去每次调用的密钥扩展
+
+    Args:
+        round_keys: pack_round_keys()返回的轮密钥（逆序即为解密）
+        data: 长度为16倍数的数据
+
+    Returns:
+        处理后的数据
+    """
+    return _ecb_rk(_aesni.sm4_aesni_ecb_crypt, round_keys, data)
+
+
+def neon_available():
+    """ARMv8 SM4指令内核是否可用"""
+    return _neon is not None
+
+
+def neon_ecb_encrypt(key, data):
+    """使用ARMv8 SM4指令内核ECB加密"""
+    return _ecb(_neon.sm4_neon_ecb_encrypt, key, data)
+
+
+def neon_ecb_decrypt(key, data):
+    """使用ARMv8 SM4指令内核ECB解密"""
+    return _ecb(_neon.sm4_neon_ecb_decrypt, key, data)
+
+
+def neon_ecb_crypt(round_keys, data):
+    """使用预先扩展的轮密钥调用ARMv8 SM4指令内核（参数同aesni_ecb_crypt）"""
+    return _ecb_rk(_neon.sm4_neon_ecb_crypt, round_keys, data)
+
+
+def neon_tbl_available():
+    """ARM NEON查表内核是否可用"""
+    return _neon_tbl is not None
+
+
+def neon_tbl_ecb_encrypt(key, data):
+    """使用ARM NEON查表内核ECB加密"""
+    return _ecb(_neon_tbl.sm4_neon_tbl_ecb_encrypt, key, data)
+
+
+def neon_tbl_ecb_decrypt(key, data):
+    """使用ARM NEON查表内核ECB解密"""
+    return _ecb(_neon_tbl.sm4_neon_tbl_ecb_decrypt, key, data)
+
+
+def neon_tbl_ecb_crypt(round_keys, data):
+    """使用预先扩展的轮密钥调用ARM NEON查表内核（参数同aesni_ecb_crypt）"""
+    return _ecb_rk(_neon_tbl.sm4_neon_tbl_ecb_crypt, round_keys, data)
+
+
+def ttable_available():
+    """通用T表内核是否可用"""
+    return _ttable is not None
+
+
+def ttable_ecb_encrypt(key, data):
+    """使用通用T表内核ECB加密"""
+    return _ecb(_ttable.sm4_ttable_ecb_encrypt, key, data)
+
+
+def ttable_ecb_decrypt(key, data):
+    """使用通用T表内核ECB解密"""
+    return _ecb(_ttable.sm4_ttable_ecb_decrypt, key, data)
+
+
+def ttable_ecb_crypt(round_keys, data):
+    """使用预先扩展的轮密钥调用通用T表内核（参数同aesni_ecb_crypt）"""
+    return _ecb_rk(_ttable.sm4_ttable_ecb_crypt, round_keys, data)
+
+
+def _load_ghash(name, prefix):
+    """加载提供 <prefix>_gfmul/blocks/square/available 接口的GHASH内核，返回(gfmul, blocks, square)"""
+    lib = _load(name)
+    if lib is None:
+        return None
+    gfmul = getattr(lib, prefix + '_gfmul')
+    gfmul.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_char_p]
+    gfmul.restype = None
+    blocks = getattr(lib, prefix + '_blocks')
+    # 数据参数为c_void_p，可传入bytes，也可传入分段起始地址
+    blocks.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_void_p, ctypes.c_size_t]
+    blocks.restype = None
+    square = getattr(lib, prefix + '_square')
+    square.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
+    square.restype = None
+    available = getattr(lib, prefix + '_available')
+    available.restype = ctypes.c_int
+    return (gfmul, blocks, square) if available() else None
+
+
+# GCM GHASH无进位乘法内核：x86 PCLMULQDQ，否则尝试ARMv8 PMULL
+_ghash = (_load_ghash('libsm4_ghash.so', 'sm4_ghash')
+          or _load_ghash('libsm4_ghash_pmull.so', 'sm4_ghash_pmull'))
+
+
+def ghash_available():
+    """GHASH无进位乘法内核（PCLMULQDQ或PMULL）是否可用"""
+    return _ghash is not None
+
+
+def ghash_gfmul(x, y):
+    """GF(2^128)乘法，结果与SM4_GCM_Base._ghash_optimized_gfmul(x, y)一致"""
+    out = ctypes.create_string_buffer(16)
+    _ghash[0](bytes(x), bytes(y), out)
+    return out.raw
+
+
+def ghash_square(x):
+    """GF(2^128)平方，x与结果均为16字节小端整数（H的幂次的存放格式）"""
+    out = ctypes.create_string_buffer(16)
+    _ghash[2](bytes(x), out)
+    return out.raw
+
+
+def _buffer_address(data):
+    """
+    返回(缓冲区首地址, 调用期间须保持存活的对象)
+
+    bytes与可写缓冲区（bytearray、可写memoryview等）直接取地址，
+    只有bytes以外的只读缓冲区需要复制一次
+    """
+    if not isinstance(data, bytes):
+        view = memoryview(data)
+        if not view.readonly:
+            buf = ctypes.c_char.from_buffer(view)
+            return ctypes.addressof(buf), buf
+        data = bytes(view)
+    return ctypes.cast(data, ctypes.c_void_p).value, data
+
+
+def ghash_blocks(h, data, y=bytes(16), start=0, stop=None):
+    """
+    对data中的分组依次计算 y = (y ^ block) · h
+
+    Args:
+        h: 16字节Hash子密钥
+        data: 待处理数据，只处理其中的完整分组
+        y: 16字节初始值
+        start, stop: 只处理第start至stop-1个分组，按地址偏移传入，不复制数据
+
+    Returns:
+        16字节GHASH结果
+    """
+    acc = ctypes.create_string_buffer(bytes(y), 16)
+    if stop is None:
+        stop = len(data) // 16
+    if stop > start:
+        address, keep = _buffer_address(data)
+        _ghash[1](bytes(h), acc, address + 16 * start, stop - start)
+    return acc.raw
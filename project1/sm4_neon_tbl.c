@@ -0,0 +1,114 @@
+/*
+ * SM4 ARM NEON Table-Lookup Implementation
+ * 基于 NEON TBL / TBX 查表的 SM4 S 盒 4 分组并行实现
+ *
+ * 面向没有 SM4 扩展指令的 ARMv8 处理器：S 盒通过 1 次 TBL 与 3 次 TBX
+ * 查表（每次覆盖 64 项）完成，TBL 对越界索引返回 0，TBX 对越界索引保留已有结果。
+ * 状态按列存放，循环左移使用 SHL + SRI 两条指令。
+ * NEON 为 AArch64 的基础指令集，该路径在 aarch64 上总是可用。
+ */
+
+#include "sm4_common.h"
+
+#ifdef __aarch64__
+#include <arm_neon.h> // ARM NEON intrinsics
+
+#define ROL128(x, n) vsriq_n_u32(vshlq_n_u32((x), (n)), (x), 32 - (n))
+
+static inline uint32x4_t sm4_t_x4(uint32x4_t x, const uint8x16x4_t tbl[4])
+{
+    const uint8x16_t k64 = vdupq_n_u8(64);
+    uint8x16_t b = vreinterpretq_u8_u32(x);
+    uint8x16_t s = vqtbl4q_u8(tbl[0], b);
+
+    // TBX 对越界索引保留原值，后三段查表直接合并，无需额外的 ORR
+    b = vsubq_u8(b, k64);
+    s = vqtbx4q_u8(s, tbl[1], b);
+    b = vsubq_u8(b, k64);
+    s = vqtbx4q_u8(s, tbl[2], b);
+    b = vsubq_u8(b, k64);
+    s = vqtbx4q_u8(s, tbl[3], b);
+
+    x = vreinterpretq_u32_u8(s);
+    return veorq_u32(veorq_u32(x, ROL128(x, 2)),
+                     veorq_u32(ROL128(x, 10), veorq_u32(ROL128(x, 18), ROL128(x, 24))));
+}
+
+// 处理 4 个连续分组（64 字节）
+static void sm4_crypt_x4(const uint32_t rk[32], const uint8_t *in, uint8_t *out)
+{
+    uint8x16x4_t tbl[4];
+    for (int i = 0; i < 4; i++)
+        tbl[i] = vld1q_u8_x4(SBOX + 64 * i);
+
+    // vld4q 按字交织载入：val[j] 为 4 个分组的第 j 个字
+    uint32x4x4_t v = vld4q_u32((const uint32_t *)in);
+    uint32x4_t x[4];
+    for (int j = 0; j < 4; j++)
+        x[j] = vreinterpretq_u32_u8(vrev32q_u8(vreinterpretq_u8_u32(v.val[j])));
+
+    for (int i = 0; i < 32; i += 4)
+    {
+        x[0] = veorq_u32(x[0], sm4_t_x4(veorq_u32(veorq_u32(x[1], x[2]), veorq_u32(x[3], vdupq_n_u32(rk[i]))), tbl));
+        x[1] = veorq_u32(x[1], sm4_t_x4(veorq_u32(veorq_u32(x[2], x[3]), veorq_u32(x[0], vdupq_n_u32(rk[i + 1]))), tbl));
+        x[2] = veorq_u32(x[2], sm4_t_x4(veorq_u32(veorq_u32(x[3], x[0]), veorq_u32(x[1], vdupq_n_u32(rk[i + 2]))), tbl));
+        x[3] = veorq_u32(x[3], sm4_t_x4(veorq_u32(veorq_u32(x[0], x[1]), veorq_u32(x[2], vdupq_n_u32(rk[i + 3]))), tbl));
+    }
+
+    for (int j = 0; j < 4; j++)
+        v.val[j] = vreinterpretq_u32_u8(vrev32q_u8(vreinterpretq_u8_u32(x[3 - j])));
+    vst4q_u32((uint32_t *)out, v);
+}
+
+static void sm4_neon_tbl_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    sm4_ecb_run(sm4_crypt_x4, 4, rk, in, out, nblocks);
+}
+
+int sm4_neon_tbl_available(void)
+{
+    return 1;
+}
+
+#else
+
+int sm4_neon_tbl_available(void)
+{
+    return 0;
+}
+
+static void sm4_neon_tbl_ecb(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    (void)rk;
+    (void)in;
+    (void)out;
+    (void)nblocks;
+}
+
+#endif
+
+/*
+ * ECB 加密 nblocks 个 16 字节分组
+ * 调用前须确认 sm4_neon_tbl_available() 返回非零
+ */
+void sm4_neon_tbl_ecb_encrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32];
+    sm4_expand_key(key, rk);
+    sm4_neon_tbl_ecb(rk, in, out, nblocks);
+}
+
+// ECB 解密：轮密钥逆序使用
+void sm4_neon_tbl_ecb_decrypt(const uint8_t *key, const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    uint32_t rk[32], rrk[32];
+    sm4_expand_key(key, rk);
+    sm4_reverse_keys(rk, rrk);
+    sm4_neon_tbl_ecb(rrk, in, out, nblocks);
+}
+
+// 使用调用方预先扩展的轮密钥处理 nblocks 个分组（传入逆序轮密钥即为解密）
+void sm4_neon_tbl_ecb_crypt(const uint32_t rk[32], const uint8_t *in, uint8_t *out, size_t nblocks)
+{
+    sm4_neon_tbl_ecb(rk, in, out, nblocks);
+}
@@ -0,0 +1,96 @@
+# SM4 T-Table 优化的 Numba JIT 内核
+
+"""
+将T表版本SM4的分组循环编译为本地代码
+
+状态以连续的uint32数组传入（每4个字为一个分组），32轮迭代全部在
+寄存器中完成，避免了解释器逐轮的属性查找和整数装箱开销。
+"""
+
+from numba import njit, prange, uint32
+from numba.types import UniTuple
+
+
+@njit(uint32[::1](uint32[::1], uint32[::1], uint32[::1], uint32[::1], uint32[::1], uint32[::1]),
+      cache=True)
+def _crypt_blocks(state, rk, T0, T1, T2, T3):
+    """
+    原地加密(或使用逆序轮密钥解密)state中的所有分组
+
+    Args:
+        state: uint32数组，长度为4的倍数，按大端字序解析后的明文字
+        rk: 32个uint32轮密钥
+        T0, T1, T2, T3: 256项uint32 T表
+
+    Returns:
+        state本身，其中每个分组已替换为反序变换后的输出字
+    """
+    for blk in range(state.size // 4):
+        base = blk * 4
+        x0 = state[base]
+        x1 = state[base + 1]
+        x2 = state[base + 2]
+        x3 = state[base + 3]
+
+        # 每次迭代展开4轮，轮换通过变量重命名完成
+        for i in range(0, 32, 4):
+            t = x1 ^ x2 ^ x3 ^ rk[i]
+            x0 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+            t = x2 ^ x3 ^ x0 ^ rk[i + 1]
+            x1 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+            t = x3 ^ x0 ^ x1 ^ rk[i + 2]
+            x2 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+            t = x0 ^ x1 ^ x2 ^ rk[i + 3]
+            x3 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+
+        # 反序变换
+        state[base] = x3
+        state[base + 1] = x2
+        state[base + 2] = x1
+        state[base + 3] = x0
+
+    return state
+
+
+@njit(UniTuple(uint32, 4)(uint32, uint32, uint32, uint32, uint32[::1],
+                          uint32[::1], uint32[::1], uint32[::1], uint32[::1]),
+      cache=True, boundscheck=False)
+def _crypt_block(x0, x1, x2, x3, rk, T0, T1, T2, T3):
+    """
+    处理单个分组，输入输出均为4个字，省去单块调用时数组的构造与拷贝
+
+    Returns:
+        反序变换后的4个输出字
+    """
+    for i in range(0, 32, 4):
+        t = x1 ^ x2 ^ x3 ^ rk[i]
+        x0 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+        t = x2 ^ x3 ^ x0 ^ rk[i + 1]
+        x1 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+        t = x3 ^ x0 ^ x1 ^ rk[i + 2]
+        x2 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+        t = x0 ^ x1 ^ x2 ^ rk[i + 3]
+        x3 ^= T0[(t >> 24) & 0xff] ^ T1[(t >> 16) & 0xff] ^ T2[(t >> 8) & 0xff] ^ T3[t & 0xff]
+
+    return x3, x2, x1, x0
+
+
+@njit(uint32[::1](uint32[::1], uint32[::1], uint32[::1], uint32[::1], uint32[::1], uint32[::1]),
+      parallel=True, cache=True)
+def _crypt_blocks_parallel(state, rk, T0, T1, T2, T3):
+    """
+    与_crypt_blocks相同，但各分组通过prange分配到多个线程
+
+    ECB下各分组互不依赖，大数据量时可扩展到内存带宽上限；
+    线程调度有固定开销，只应用于足够大的输入。
+    """
+    for blk in prange(state.size // 4):
+        base = blk * 4
+        y0, y1, y2, y3 = _crypt_block(state[base], state[base + 1], state[base + 2], state[base + 3],
+                                      rk, T0, T1, T2, T3)
+        state[base] = y0
+        state[base + 1] = y1
+        state[base + 2] = y2
+        state[base + 3] = y3
+
+    return state